@@ -10,7 +10,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app'))
 
 # Import your Base and all models
 from app.db import Base
-from app.models import user, insight  # 👈 include ALL your models here
+from app.models import user, insight, embedding, cluster, enrichment, nlp_cache  # 👈 include ALL your models here
 
 # This config object provides access to values in alembic.ini
 config = context.config
@@ -0,0 +1,29 @@
+"""index insight_embeddings.insight_id
+
+Revision ID: 0a6d4e9c7b15
+Revises: f1b8c3d6a920
+Create Date: 2026-10-18 16:31:04.551870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6d4e9c7b15'
+down_revision: Union[str, Sequence[str], None] = 'f1b8c3d6a920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # backs the backfill anti-join and every per-insight embedding lookup
+    op.create_index(op.f('ix_insight_embeddings_insight_id'), 'insight_embeddings', ['insight_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_insight_embeddings_insight_id'), table_name='insight_embeddings')
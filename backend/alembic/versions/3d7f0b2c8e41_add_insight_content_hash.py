@@ -0,0 +1,30 @@
+"""add insights.content_hash
+
+Revision ID: 3d7f0b2c8e41
+Revises: 0a6d4e9c7b15
+Create Date: 2026-10-18 17:02:47.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d7f0b2c8e41'
+down_revision: Union[str, Sequence[str], None] = '0a6d4e9c7b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('insights', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    # same digest as app.core.nlp_cache.text_hash (sha256 of the UTF-8 text, hex)
+    op.execute("UPDATE insights SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('insights', 'content_hash')
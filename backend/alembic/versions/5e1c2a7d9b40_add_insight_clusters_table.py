@@ -0,0 +1,45 @@
+"""add insight_clusters table
+
+Revision ID: 5e1c2a7d9b40
+Revises: b9dd4f5f39dc
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '5e1c2a7d9b40'
+down_revision: Union[str, Sequence[str], None] = 'b9dd4f5f39dc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('insight_clusters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('cluster_id', sa.Integer(), nullable=False),
+    sa.Column('centroid', postgresql.ARRAY(sa.Float()), nullable=False),
+    sa.Column('member_count', sa.Integer(), nullable=False),
+    sa.Column('representative_insight_id', sa.Integer(), nullable=True),
+    sa.Column('representative_score', sa.Float(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['representative_insight_id'], ['insights.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'cluster_id', name='uq_insight_clusters_user_cluster')
+    )
+    op.create_index(op.f('ix_insight_clusters_id'), 'insight_clusters', ['id'], unique=False)
+    op.create_index(op.f('ix_insight_clusters_user_id'), 'insight_clusters', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_insight_clusters_user_id'), table_name='insight_clusters')
+    op.drop_index(op.f('ix_insight_clusters_id'), table_name='insight_clusters')
+    op.drop_table('insight_clusters')
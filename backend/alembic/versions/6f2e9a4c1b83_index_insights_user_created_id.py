@@ -0,0 +1,29 @@
+"""index insights (user_id, created_at, id)
+
+Revision ID: 6f2e9a4c1b83
+Revises: 3d7f0b2c8e41
+Create Date: 2026-10-18 17:25:39.640112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f2e9a4c1b83'
+down_revision: Union[str, Sequence[str], None] = '3d7f0b2c8e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # keyset pagination of GET /insights/
+    op.create_index('ix_insights_user_created_id', 'insights', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_insights_user_created_id', table_name='insights')
@@ -0,0 +1,67 @@
+"""store insight embeddings as pgvector when available
+
+Revision ID: 8b3f61d0c2e7
+Revises: 5e1c2a7d9b40
+Create Date: 2026-10-18 11:40:07.118254
+
+Only runs when EMBEDDING_STORAGE=pgvector is set for the migration and the
+`vector` extension is available on the server; otherwise the column keeps the
+double precision[] format and the app falls back to in-process search.
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b3f61d0c2e7'
+down_revision: Union[str, Sequence[str], None] = '5e1c2a7d9b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "384"))
+
+
+def _column_type(conn):
+    return conn.execute(sa.text(
+        "SELECT udt_name FROM information_schema.columns "
+        "WHERE table_name = 'insight_embeddings' AND column_name = 'vector'"
+    )).scalar()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if os.getenv("EMBEDDING_STORAGE", "array") != "pgvector":
+        return
+    conn = op.get_bind()
+    available = conn.execute(sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'vector'")).scalar()
+    if not available:
+        print("pgvector extension not available on this server; keeping array embedding storage")
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    if _column_type(conn) != "_float8":
+        return
+    # existing rows are converted in place (double precision[] -> float32 vector)
+    op.execute(
+        f"ALTER TABLE insight_embeddings ALTER COLUMN vector "
+        f"TYPE vector({EMBEDDING_DIM}) USING vector::vector({EMBEDDING_DIM})"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_insight_embeddings_vector_hnsw "
+        "ON insight_embeddings USING hnsw (vector vector_cosine_ops)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    if _column_type(conn) != "vector":
+        return
+    op.execute("DROP INDEX IF EXISTS ix_insight_embeddings_vector_hnsw")
+    op.execute(
+        "ALTER TABLE insight_embeddings ALTER COLUMN vector "
+        "TYPE double precision[] USING vector::real[]::double precision[]"
+    )
@@ -0,0 +1,52 @@
+"""extend benchmark_results with workload, percentiles, run and host metadata
+
+Revision ID: a2c5e8f1d374
+Revises: 6f2e9a4c1b83
+Create Date: 2026-10-18 19:41:07.218553
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2c5e8f1d374'
+down_revision: Union[str, Sequence[str], None] = '6f2e9a4c1b83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('benchmark_results', sa.Column('run_id', sa.String(length=32), nullable=True))
+    op.add_column('benchmark_results', sa.Column('workload', sa.String(length=64), nullable=True))
+    op.add_column('benchmark_results', sa.Column('corpus_size', sa.Integer(), nullable=True))
+    op.add_column('benchmark_results', sa.Column('batch_size', sa.Integer(), nullable=True))
+    op.add_column('benchmark_results', sa.Column('p50_ms', sa.Float(), nullable=True))
+    op.add_column('benchmark_results', sa.Column('p95_ms', sa.Float(), nullable=True))
+    op.add_column('benchmark_results', sa.Column('p99_ms', sa.Float(), nullable=True))
+    op.add_column('benchmark_results', sa.Column('throughput', sa.Float(), nullable=True))
+    op.add_column('benchmark_results', sa.Column('peak_rss_mb', sa.Float(), nullable=True))
+    op.add_column('benchmark_results', sa.Column('git_revision', sa.String(length=64), nullable=True))
+    op.add_column('benchmark_results', sa.Column('host_fingerprint', sa.String(length=16), nullable=True))
+    op.add_column('benchmark_results', sa.Column('is_baseline', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.alter_column('benchmark_results', 'model_name', existing_type=sa.String(), nullable=True)
+    # rows written by benchmark_compare.py before this migration were BART summarization timings
+    op.execute("UPDATE benchmark_results SET workload = 'summarize', batch_size = 1")
+    op.create_index(op.f('ix_benchmark_results_run_id'), 'benchmark_results', ['run_id'], unique=False)
+    op.create_index(op.f('ix_benchmark_results_workload'), 'benchmark_results', ['workload'], unique=False)
+    op.create_index(op.f('ix_benchmark_results_host_fingerprint'), 'benchmark_results', ['host_fingerprint'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_benchmark_results_host_fingerprint'), table_name='benchmark_results')
+    op.drop_index(op.f('ix_benchmark_results_workload'), table_name='benchmark_results')
+    op.drop_index(op.f('ix_benchmark_results_run_id'), table_name='benchmark_results')
+    op.execute("DELETE FROM benchmark_results WHERE model_name IS NULL")
+    op.alter_column('benchmark_results', 'model_name', existing_type=sa.String(), nullable=False)
+    for column in ('is_baseline', 'host_fingerprint', 'git_revision', 'peak_rss_mb', 'throughput',
+                   'p99_ms', 'p95_ms', 'p50_ms', 'batch_size', 'corpus_size', 'workload', 'run_id'):
+        op.drop_column('benchmark_results', column)
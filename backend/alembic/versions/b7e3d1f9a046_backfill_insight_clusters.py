@@ -0,0 +1,99 @@
+"""backfill insight_clusters from existing insight_embeddings.cluster_id
+
+Revision ID: b7e3d1f9a046
+Revises: a2c5e8f1d374
+Create Date: 2026-10-18 21:12:44.507316
+
+insight_clusters was created empty while insight_embeddings kept the labels
+of the old full re-clustering. Without a row per legacy label, the first new
+cluster of a user gets id 1 and silently merges with the old cluster 1. This
+creates the missing rows (centroid = mean of the members, member count, and
+the member closest to the centroid as representative), one cluster at a
+time, streaming the embeddings in (user, cluster) order.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+from app.core import embedding_codec
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3d1f9a046'
+down_revision: Union[str, Sequence[str], None] = 'a2c5e8f1d374'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _vector_source(conn) -> str:
+    udt = conn.execute(sa.text(
+        "SELECT udt_name FROM information_schema.columns "
+        "WHERE table_name = 'insight_embeddings' AND column_name = 'vector'"
+    )).scalar()
+    # vector columns are read back through a float4[] cast so no pgvector adapter is needed
+    return "e.vector::real[]" if udt == "vector" else "e.vector"
+
+
+def _decode(value) -> np.ndarray:
+    if isinstance(value, (bytes, memoryview)):
+        return embedding_codec.decode(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def _cluster_row(user_id, cluster_id, insight_ids, vectors):
+    members = np.vstack(vectors).astype(np.float32)
+    centroid = members.mean(axis=0)
+    norms = np.linalg.norm(members, axis=1) * (np.linalg.norm(centroid) or 1.0)
+    scores = members @ centroid / np.where(norms == 0, 1.0, norms)
+    best = int(np.argmax(scores))
+    return {
+        "user_id": user_id,
+        "cluster_id": cluster_id,
+        "centroid": centroid.astype(float).tolist(),
+        "member_count": len(insight_ids),
+        "representative_insight_id": insight_ids[best],
+        "representative_score": float(scores[best]),
+    }
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+    # streamed through a server-side cursor; set on the statement, not the
+    # connection, so the INSERTs below keep a regular cursor
+    rows = conn.execute(sa.text(
+        f"SELECT i.user_id, e.cluster_id, e.insight_id, {_vector_source(conn)} "
+        "FROM insight_embeddings e JOIN insights i ON i.id = e.insight_id "
+        "WHERE e.cluster_id IS NOT NULL AND NOT EXISTS ("
+        "  SELECT 1 FROM insight_clusters c WHERE c.user_id = i.user_id AND c.cluster_id = e.cluster_id"
+        ") ORDER BY i.user_id, e.cluster_id, e.insight_id"
+    ).execution_options(stream_results=True, yield_per=2000))
+
+    insert = sa.text(
+        "INSERT INTO insight_clusters (user_id, cluster_id, centroid, member_count, "
+        "representative_insight_id, representative_score) "
+        "VALUES (:user_id, :cluster_id, :centroid, :member_count, :representative_insight_id, :representative_score)"
+    )
+    pending, key, ids, vectors = [], None, [], []
+    for user_id, cluster_id, insight_id, vector in rows:
+        if (user_id, cluster_id) != key:
+            if ids:
+                pending.append(_cluster_row(*key, ids, vectors))
+            key, ids, vectors = (user_id, cluster_id), [], []
+        ids.append(insight_id)
+        vectors.append(_decode(vector))
+        if len(pending) >= 500:
+            conn.execute(insert, pending)
+            pending = []
+    if ids:
+        pending.append(_cluster_row(*key, ids, vectors))
+    if pending:
+        conn.execute(insert, pending)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # backfilled rows are indistinguishable from live ones and stay valid
+    pass
@@ -0,0 +1,85 @@
+"""store insight embeddings as packed float32 / int8 bytes
+
+Revision ID: c4a9e2f57d13
+Revises: 8b3f61d0c2e7
+Create Date: 2026-10-18 13:05:52.640981
+
+Only runs when EMBEDDING_STORAGE is "float32" or "int8" for the migration.
+Existing rows are re-encoded in keyset-ordered batches through
+app.core.embedding_codec, then the bytea column replaces the old one.
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.core import embedding_codec
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a9e2f57d13'
+down_revision: Union[str, Sequence[str], None] = '8b3f61d0c2e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def _column_type(conn):
+    return conn.execute(sa.text(
+        "SELECT udt_name FROM information_schema.columns "
+        "WHERE table_name = 'insight_embeddings' AND column_name = 'vector'"
+    )).scalar()
+
+
+def _convert(conn, select_sql, encode, new_type):
+    """Copy `vector` into `vector_new` batch by batch, then swap the columns."""
+    op.add_column('insight_embeddings', sa.Column('vector_new', new_type, nullable=True))
+    last_id = 0
+    while True:
+        rows = conn.execute(sa.text(select_sql), {"last_id": last_id, "limit": BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            sa.text("UPDATE insight_embeddings SET vector_new = :v WHERE id = :id"),
+            [{"id": row_id, "v": encode(vector)} for row_id, vector in rows],
+        )
+        last_id = rows[-1][0]
+    op.drop_column('insight_embeddings', 'vector')
+    op.alter_column('insight_embeddings', 'vector_new', new_column_name='vector', nullable=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    fmt = os.getenv("EMBEDDING_STORAGE", "array")
+    if fmt not in ("float32", "int8"):
+        return
+    conn = op.get_bind()
+    current = _column_type(conn)
+    if current not in ("_float8", "vector"):
+        return
+    # vector columns are read back through a float4[] cast so no pgvector adapter is needed
+    source = "vector::real[]" if current == "vector" else "vector"
+    op.execute("DROP INDEX IF EXISTS ix_insight_embeddings_vector_hnsw")
+    _convert(
+        conn,
+        f"SELECT id, {source} FROM insight_embeddings WHERE id > :last_id ORDER BY id LIMIT :limit",
+        lambda vector: embedding_codec.encode(vector, fmt),
+        sa.LargeBinary(),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    if _column_type(conn) != "bytea":
+        return
+    _convert(
+        conn,
+        "SELECT id, vector FROM insight_embeddings WHERE id > :last_id ORDER BY id LIMIT :limit",
+        lambda blob: np.asarray(embedding_codec.decode(blob), dtype=float).tolist(),
+        postgresql.ARRAY(sa.Float()),
+    )
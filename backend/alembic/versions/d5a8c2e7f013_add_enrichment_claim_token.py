@@ -0,0 +1,28 @@
+"""add enrichment_jobs.claim_token
+
+Revision ID: d5a8c2e7f013
+Revises: b7e3d1f9a046
+Create Date: 2026-10-18 21:48:30.114826
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a8c2e7f013'
+down_revision: Union[str, Sequence[str], None] = 'b7e3d1f9a046'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('enrichment_jobs', sa.Column('claim_token', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('enrichment_jobs', 'claim_token')
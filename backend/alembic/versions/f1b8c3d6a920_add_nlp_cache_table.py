@@ -0,0 +1,41 @@
+"""add nlp_cache table
+
+Revision ID: f1b8c3d6a920
+Revises: e7d25b8a4f61
+Create Date: 2026-10-18 15:48:36.227409
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b8c3d6a920'
+down_revision: Union[str, Sequence[str], None] = 'e7d25b8a4f61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('nlp_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=32), nullable=False),
+    sa.Column('model_name', sa.String(), nullable=False),
+    sa.Column('model_revision', sa.String(), nullable=False),
+    sa.Column('text_hash', sa.String(length=64), nullable=False),
+    sa.Column('value', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('vector', sa.LargeBinary(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('kind', 'model_name', 'model_revision', 'text_hash', name='uq_nlp_cache_key')
+    )
+    op.create_index(op.f('ix_nlp_cache_created_at'), 'nlp_cache', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_nlp_cache_created_at'), table_name='nlp_cache')
+    op.drop_table('nlp_cache')
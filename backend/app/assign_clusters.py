@@ -1,28 +1,275 @@
+"""
+Offline re-clustering of every stored embedding.
+
+  1. one streamed query loads all vectors, ordered by user, into a contiguous
+     float32 matrix (a np.memmap in a temp file when it would not fit in
+     --max-memory-mb), so each user is a single row slice
+  2. users are clustered in parallel in a process pool; workers read the
+     shared matrix and return only labels and cluster summaries
+  3. per user, changed cluster ids are written back with batched UPDATEs and
+     the user's insight_clusters rows are replaced, one transaction per user
+
+`--dry-run` skips step 3 and prints the cluster count/size distribution.
+"""
 import sys, os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import argparse
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sqlalchemy import bindparam, func, select, update
+
 from app.db import SessionLocal
-from app.models.embedding import InsightEmbedding
 from app.models.insight import Insight
-from app.core.clustering import generate_embedding, find_cluster
-
-db = SessionLocal()
-
-# load all embeddings and assign cluster ids by simple sequential clustering
-all_embs = db.query(InsightEmbedding).all()
-vectors = [e.vector for e in all_embs]
-
-for i, emb in enumerate(all_embs):
-    if emb.cluster_id:
-        continue
-    # cluster against other vectors (excluding self for initial pass)
-    others = [v for idx, v in enumerate(vectors) if idx != i]
-    cluster_index = find_cluster(emb.vector, others, threshold=0.65)
-    # map to cluster id: if cluster_index <= len(others) -> assign existing index+1
-    # simple heuristic:
-    emb.cluster_id = cluster_index
-    db.add(emb)
-db.commit()
-db.close()
-print("Reassigned cluster ids")
+from app.models.embedding import InsightEmbedding
+from app.models.cluster import InsightCluster
+from app.core.clustering import (
+    CLUSTER_METHODS,
+    DEFAULT_THRESHOLD,
+    assign_to_centroid,
+    centroid_add,
+    cluster_indices,
+    summarize_members,
+)
+from app.core.cluster_service import lock_user_clusters
+from app.core.vector_index import drop_user_index
+
+
+def _default_memory_budget_mb():
+    try:
+        import psutil
+    except ImportError:
+        return 1024
+    return int(psutil.virtual_memory().available / 1e6 / 2)
+
+
+def load_matrix(db, max_memory_mb, yield_per=5000):
+    """
+    Returns (matrix, embedding row ids, insight ids, current cluster ids,
+    {user_id: (start, end)}, memmap path or None).
+    """
+    n = db.execute(
+        select(func.count()).select_from(InsightEmbedding).join(Insight, Insight.id == InsightEmbedding.insight_id)
+    ).scalar()
+    stmt = (
+        select(Insight.user_id, InsightEmbedding.id, InsightEmbedding.insight_id,
+               InsightEmbedding.cluster_id, InsightEmbedding.vector)
+        .join(Insight, Insight.id == InsightEmbedding.insight_id)
+        .order_by(Insight.user_id, InsightEmbedding.insight_id)
+        .execution_options(yield_per=yield_per)
+    )
+
+    row_ids = np.empty(n, dtype=np.int64)
+    insight_ids = np.empty(n, dtype=np.int64)
+    cluster_ids = np.zeros(n, dtype=np.int64)  # 0 = unassigned
+    spans, matrix, path = {}, None, None
+    i = 0
+    for user_id, row_id, insight_id, cluster_id, vector in db.execute(stmt):
+        if i >= n:
+            break  # rows inserted after the count; the next run picks them up
+        vec = np.asarray(vector, dtype=np.float32)
+        if matrix is None:
+            if n * vec.shape[0] * 4 / 1e6 > max_memory_mb:
+                fd, path = tempfile.mkstemp(prefix="insight-vectors-", suffix=".f32")
+                os.close(fd)
+                matrix = np.memmap(path, dtype=np.float32, mode="w+", shape=(n, vec.shape[0]))
+            else:
+                matrix = np.empty((n, vec.shape[0]), dtype=np.float32)
+        matrix[i] = vec
+        row_ids[i], insight_ids[i], cluster_ids[i] = row_id, insight_id, cluster_id or 0
+        start, _ = spans.get(user_id, (i, i))
+        spans[user_id] = (start, i + 1)
+        i += 1
+
+    if matrix is None:
+        matrix = np.empty((0, 0), dtype=np.float32)
+    elif isinstance(matrix, np.memmap):
+        matrix.flush()
+    return matrix[:i], row_ids[:i], insight_ids[:i], cluster_ids[:i], spans, path
+
+
+# ---- worker side ----
+
+_matrix = None
+
+
+def _init_worker(matrix_or_path, shape):
+    global _matrix
+    if isinstance(matrix_or_path, str):
+        _matrix = np.memmap(matrix_or_path, dtype=np.float32, mode="r", shape=shape)
+    else:
+        _matrix = matrix_or_path
+
+
+def cluster_span(user_id, start, end, threshold, method):
+    """
+    Cluster rows [start, end) of the shared matrix. Returns per-row cluster ids
+    and one (cluster_id, centroid, member_count, representative row, score)
+    per cluster, with rows relative to `start`.
+    """
+    embeddings = np.asarray(_matrix[start:end])
+    labels = np.empty(end - start, dtype=np.int64)
+    summaries = []
+    for c in cluster_indices(embeddings, threshold=threshold, method=method):
+        idxs = c['indices']
+        labels[idxs] = c['cluster_id']
+        centroid, best, score = summarize_members(embeddings[idxs])
+        summaries.append((c['cluster_id'], centroid, len(idxs), idxs[best], score))
+    return user_id, labels, summaries
+
+
+# ---- write side ----
+
+def write_user(db, user_id, row_ids, insight_ids, old_cluster_ids, labels, summaries, threshold, batch_size):
+    """Persist one user's clustering; returns the number of embedding rows updated."""
+    # same lock assign_insight takes, so the live write path waits for us
+    lock_user_clusters(db, user_id)
+
+    # executemany of a plain UPDATE; rows deleted since the load simply match nothing
+    table = InsightEmbedding.__table__
+    stmt = update(table).where(table.c.id == bindparam("row_id")).values(cluster_id=bindparam("new_cluster_id"))
+    changed = np.flatnonzero(labels != old_cluster_ids)
+    for lo in range(0, len(changed), batch_size):
+        idxs = changed[lo:lo + batch_size]
+        db.execute(stmt, [{"row_id": int(row_ids[j]), "new_cluster_id": int(labels[j])} for j in idxs])
+
+    reps = {int(insight_ids[rep]) for _, _, _, rep, _ in summaries}
+    alive = {row[0] for row in db.query(Insight.id).filter(Insight.id.in_(reps))}
+    clusters = {
+        cid: {"centroid": centroid, "count": count, "score": score,
+              "rep": int(insight_ids[rep]) if int(insight_ids[rep]) in alive else None}
+        for cid, centroid, count, rep, score in summaries
+    }
+
+    # embeddings written after the matrix was loaded: place them on the new centroids
+    loaded_max = int(row_ids.max()) if len(row_ids) else 0
+    late = (
+        db.query(InsightEmbedding)
+        .join(Insight, Insight.id == InsightEmbedding.insight_id)
+        .filter(Insight.user_id == user_id, InsightEmbedding.id > loaded_max)
+        .all()
+    )
+    for emb in late:
+        vec = np.asarray(emb.vector, dtype=np.float32)
+        cids = list(clusters)
+        centroids = np.asarray([clusters[cid]["centroid"] for cid in cids], dtype=np.float32)
+        best = assign_to_centroid(vec, centroids, threshold) if cids else None
+        if best is None:
+            cid = max(cids, default=0) + 1
+            clusters[cid] = {"centroid": vec, "count": 1, "rep": emb.insight_id, "score": 1.0}
+        else:
+            cid = cids[best]
+            c = clusters[cid]
+            c["centroid"] = centroid_add(c["centroid"], c["count"], vec)
+            c["count"] += 1
+        emb.cluster_id = cid
+
+    db.query(InsightCluster).filter(InsightCluster.user_id == user_id).delete(synchronize_session=False)
+    db.bulk_save_objects([
+        InsightCluster(
+            user_id=user_id,
+            cluster_id=cid,
+            centroid=np.asarray(c["centroid"], dtype=np.float32).tolist(),
+            member_count=c["count"],
+            representative_insight_id=c["rep"],
+            representative_score=c["score"],
+        )
+        for cid, c in clusters.items()
+    ])
+    db.commit()
+    drop_user_index(user_id)
+    return len(changed) + len(late)
+
+
+def report(sizes, users, rows, timings, memmapped):
+    sizes = np.asarray(sizes, dtype=np.int64)
+    print(f"📊 {rows} embeddings, {users} users, {len(sizes)} clusters"
+          f"{' (matrix memory-mapped)' if memmapped else ''}")
+    if len(sizes):
+        print(f"   size min {sizes.min()}, median {int(np.median(sizes))}, "
+              f"p90 {int(np.percentile(sizes, 90))}, max {sizes.max()}, mean {sizes.mean():.1f}")
+        edges = [1, 2, 5, 10, 50, 100]
+        for lo, hi in zip(edges, edges[1:] + [None]):
+            n = int(((sizes >= lo) & (sizes < hi)).sum()) if hi else int((sizes >= lo).sum())
+            label = f"{lo}" if hi == lo + 1 else (f"{lo}-{hi - 1}" if hi else f"{lo}+")
+            print(f"   {label:>7}: {n}")
+    print("⏱️  " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+
+
+def run(threshold=DEFAULT_THRESHOLD, method="incremental", workers=None, dry_run=False,
+        batch_size=1000, max_memory_mb=None):
+    started = time.perf_counter()
+    timings = {}
+    db = SessionLocal()
+    path = None
+    try:
+        matrix, row_ids, insight_ids, cluster_ids, spans, path = load_matrix(
+            db, max_memory_mb if max_memory_mb is not None else _default_memory_budget_mb()
+        )
+        db.rollback()  # don't hold the read snapshot while clustering
+        timings["load"] = time.perf_counter() - started
+
+        # largest users first so one big user doesn't end up last on a single worker
+        jobs = sorted(spans.items(), key=lambda item: item[1][0] - item[1][1])
+        sizes, updated = [], 0
+        cluster_started = time.perf_counter()
+        write_seconds = 0.0
+
+        def handle(user_id, labels, summaries):
+            nonlocal updated, write_seconds
+            sizes.extend(count for _, _, count, _, _ in summaries)
+            if dry_run:
+                return
+            t0 = time.perf_counter()
+            start, end = spans[user_id]
+            updated += write_user(db, user_id, row_ids[start:end], insight_ids[start:end],
+                                  cluster_ids[start:end], labels, summaries, threshold, batch_size)
+            write_seconds += time.perf_counter() - t0
+
+        shared = (path, matrix.shape) if path else (matrix, matrix.shape)
+        if workers == 1 or len(jobs) <= 1:
+            _init_worker(*shared)
+            for user_id, (start, end) in jobs:
+                handle(*cluster_span(user_id, start, end, threshold, method))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=shared) as pool:
+                futures = [
+                    pool.submit(cluster_span, user_id, start, end, threshold, method)
+                    for user_id, (start, end) in jobs
+                ]
+                # results are written as they arrive, overlapping DB writes with clustering
+                for future in as_completed(futures):
+                    handle(*future.result())
+
+        timings["cluster"] = time.perf_counter() - cluster_started - write_seconds
+        if not dry_run:
+            timings["write"] = write_seconds
+        timings["total"] = time.perf_counter() - started
+    finally:
+        db.close()
+        if path:
+            os.remove(path)
+
+    report(sizes, len(spans), len(row_ids), timings, memmapped=path is not None)
+    if dry_run:
+        print("🧪 Dry run: nothing written")
+    else:
+        print(f"✅ Updated {updated} embedding rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-cluster every user's stored embeddings")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--method", choices=CLUSTER_METHODS, default="incremental")
+    parser.add_argument("--workers", type=int, default=None, help="clustering processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per batched UPDATE")
+    parser.add_argument("--max-memory-mb", type=int, default=None,
+                        help="memory-map the vector matrix above this size (default: half of available RAM)")
+    parser.add_argument("--dry-run", action="store_true", help="cluster and report without writing")
+    args = parser.parse_args()
+
+    run(args.threshold, args.method, args.workers, args.dry_run, args.batch_size, args.max_memory_mb)
@@ -2,24 +2,94 @@ import sys, os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import argparse
+import time
+
+from sqlalchemy import insert, select, exists
+
 from app.db import SessionLocal
 from app.models.insight import Insight
 from app.models.embedding import InsightEmbedding
-from app.core.clustering import generate_embedding
-
-db = SessionLocal()
-
-insights = db.query(Insight).all()
-for ins in insights:
-    # skip if embedding already exists
-    exists = db.query(InsightEmbedding).filter(InsightEmbedding.insight_id == ins.id).first()
-    if exists:
-        continue
-    text = ins.summary or ins.content
-    vec = generate_embedding(text)
-    emb = InsightEmbedding(insight_id=ins.id, vector=vec, cluster_id=None)
-    db.add(emb)
-    db.commit()
-    print("Backfilled embedding for insight", ins.id)
-
-db.close()
+from app.core.model_registry import get_embedder
+
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".backfill_checkpoint")
+
+
+def read_checkpoint(path):
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path, last_id):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(str(last_id))
+    os.replace(tmp, path)
+
+
+def next_chunk(db, last_id, chunk_size):
+    """Keyset page of insights after `last_id` that have no embedding yet (anti-join)"""
+    has_embedding = exists().where(InsightEmbedding.insight_id == Insight.id)
+    stmt = (
+        select(Insight.id, Insight.summary, Insight.content)
+        .where(Insight.id > last_id, ~has_embedding)
+        .order_by(Insight.id)
+        .limit(chunk_size)
+    )
+    return db.execute(stmt).all()
+
+
+def backfill(chunk_size=512, encode_batch_size=64, checkpoint=DEFAULT_CHECKPOINT, restart=False):
+    embedder = get_embedder()
+    last_id = 0 if restart else read_checkpoint(checkpoint)
+    if last_id:
+        print(f"↩️  Resuming after insight id {last_id}")
+
+    db = SessionLocal()
+    total, started = 0, time.perf_counter()
+    try:
+        while True:
+            rows = next_chunk(db, last_id, chunk_size)
+            if not rows:
+                break
+
+            chunk_started = time.perf_counter()
+            texts = [summary or content or "" for _, summary, content in rows]
+            vectors = embedder.encode(texts, batch_size=encode_batch_size, show_progress_bar=False)
+
+            # executemany: one round trip per batch of rows instead of one commit per row
+            db.execute(insert(InsightEmbedding), [
+                {"insight_id": insight_id, "vector": vec, "cluster_id": None}
+                for (insight_id, _, _), vec in zip(rows, vectors)
+            ])
+            db.commit()
+
+            last_id = rows[-1][0]
+            write_checkpoint(checkpoint, last_id)
+            total += len(rows)
+            elapsed = time.perf_counter() - started
+            print(f"Backfilled {len(rows)} embeddings up to insight {last_id} "
+                  f"({len(rows) / (time.perf_counter() - chunk_started):.0f} rows/s, "
+                  f"total {total} at {total / elapsed:.0f} rows/s)")
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Done: {total} embeddings in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s)")
+    if total:
+        print("New embeddings have no cluster yet; run app/assign_clusters.py to cluster them.")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embed every insight that has no stored embedding yet")
+    parser.add_argument("--chunk-size", type=int, default=512, help="insights fetched/encoded/inserted per step")
+    parser.add_argument("--encode-batch-size", type=int, default=64, help="model batch size inside a chunk")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="file storing the last processed insight id")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and scan from the beginning")
+    args = parser.parse_args()
+
+    backfill(args.chunk_size, args.encode_batch_size, args.checkpoint, args.restart)
@@ -69,12 +69,17 @@ def compare_cpu_gpu():
         print(f"⚡ Performance Boost: {gain:.1f}x faster on GPU vs CPU 🚀")
 
         # ✅ Save results to DB
+        import uuid
         from app.db import SessionLocal
         from app.models.benchmark import BenchmarkResult
+        from app.core.benchmark_store import git_revision, host_fingerprint
 
+        run = dict(run_id=uuid.uuid4().hex, workload="summarize", batch_size=1,
+                   git_revision=git_revision(), host_fingerprint=host_fingerprint())
         db = SessionLocal()
         try:
             entry_gpu = BenchmarkResult(
+                **run,
                 model_name=model_name,
                 device="GPU",
                 avg_time=round(gpu_time, 3),
@@ -82,6 +87,7 @@ def compare_cpu_gpu():
                 vram_total_gb=round(torch.cuda.get_device_properties(0).total_memory / 1e9, 2)
             )
             entry_cpu = BenchmarkResult(
+                **run,
                 model_name=model_name,
                 device="CPU",
                 avg_time=round(cpu_time, 3)
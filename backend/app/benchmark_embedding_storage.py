@@ -0,0 +1,116 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# move one level up to access the 'app' package correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.core import embedding_codec
+
+DIM = 384
+
+
+def _measure(label, load, runs=3):
+    """
+    Best-of-`runs` wall time for `load()`, then one extra run under
+    tracemalloc for the peak memory it allocates
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        matrix = load()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"   {label:<22} load {min(times) * 1000:9.1f} ms | peak {peak / 1e6:8.1f} MB | "
+          f"matrix {matrix.nbytes / 1e6:6.1f} MB")
+    return min(times), peak
+
+
+def _rows_size(rows):
+    """Approximate resident size of fetched rows (what the DB driver hands back)"""
+    total = 0
+    for row in rows:
+        total += sys.getsizeof(row)
+        if isinstance(row, list):
+            total += sum(sys.getsizeof(x) for x in row)
+    return total
+
+
+def benchmark_decode(n):
+    """
+    In-process comparison of what each storage format hands back per row:
+    ARRAY(Float) -> list of Python floats, float32/int8 -> bytes blobs.
+    """
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+
+    print(f"\n📦 {n:,} vectors x {DIM} dims")
+    as_lists = vectors.astype(float).tolist()
+    as_f32 = [embedding_codec.encode_float32(v) for v in vectors]
+    as_i8 = [embedding_codec.encode_int8(v) for v in vectors]
+    print(f"   stored bytes/vector: array {DIM * 8 + 24} (+ header) | "
+          f"float32 {len(as_f32[0])} | int8 {len(as_i8[0])}")
+    print(f"   fetched rows in memory: array {_rows_size(as_lists) / 1e6:.1f} MB | "
+          f"float32 {_rows_size(as_f32) / 1e6:.1f} MB | int8 {_rows_size(as_i8) / 1e6:.1f} MB")
+
+    _measure("array (list[float])", lambda: np.asarray(as_lists, dtype=np.float32))
+    _measure("float32 (frombuffer)", lambda: np.vstack([embedding_codec.decode(b) for b in as_f32]))
+    _measure("int8 (dequantize)", lambda: np.vstack([embedding_codec.decode(b) for b in as_i8]))
+
+    restored = np.vstack([embedding_codec.decode(b) for b in as_i8])
+    cos = np.sum(restored * vectors, axis=1) / (np.linalg.norm(restored, axis=1) * np.linalg.norm(vectors, axis=1))
+    print(f"   int8 round-trip cosine: min {cos.min():.5f} | mean {cos.mean():.5f}")
+
+
+def benchmark_db(n):
+    """Round trip through temporary Postgres tables: double precision[] vs bytea."""
+    from sqlalchemy import text
+    from app.db import engine
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+
+    print(f"\n🐘 Postgres round trip, {n:,} vectors")
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TEMP TABLE bench_array (id int primary key, v double precision[])"))
+        conn.execute(text("CREATE TEMP TABLE bench_blob (id int primary key, v bytea)"))
+        for start in range(0, n, 5000):
+            chunk = vectors[start:start + 5000]
+            conn.execute(text("INSERT INTO bench_array VALUES (:id, :v)"),
+                         [{"id": start + i, "v": v.astype(float).tolist()} for i, v in enumerate(chunk)])
+            conn.execute(text("INSERT INTO bench_blob VALUES (:id, :v)"),
+                         [{"id": start + i, "v": embedding_codec.encode_float32(v)} for i, v in enumerate(chunk)])
+
+        sizes = conn.execute(text(
+            "SELECT pg_total_relation_size('bench_array'), pg_total_relation_size('bench_blob')"
+        )).one()
+        print(f"   table size: array {sizes[0] / 1e6:.1f} MB | float32 {sizes[1] / 1e6:.1f} MB")
+
+        _measure("array (fetch+convert)", lambda: np.asarray(
+            [row[0] for row in conn.execute(text("SELECT v FROM bench_array ORDER BY id"))], dtype=np.float32))
+        _measure("float32 (fetch+decode)", lambda: np.vstack(
+            [embedding_codec.decode(row[0]) for row in conn.execute(text("SELECT v FROM bench_blob ORDER BY id"))]))
+        conn.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedding storage format benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--db", action="store_true", help="also measure a round trip through Postgres")
+    args = parser.parse_args()
+
+    print("⚙️  Embedding storage benchmark (array vs float32 vs int8)")
+    for n in args.sizes:
+        benchmark_decode(n)
+        if args.db:
+            benchmark_db(n)
@@ -0,0 +1,127 @@
+"""
+Login throughput versus concurrency.
+
+Default mode drives the bounded hashing pool directly (no server or DB
+needed): for each concurrency level, that many clients verify a password
+back to back for --duration seconds. With --url it instead logs in against
+a running API, which adds routing, the DB lookup and the token encode.
+
+    python app/benchmark_login.py --levels 1,4,16,64 --rounds 12
+    python app/benchmark_login.py --url http://127.0.0.1:8000 --levels 1,8,32,128
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import time
+import uuid
+
+import numpy as np
+
+from app.core.password_hashing import (
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_MAX_PENDING,
+    PASSWORD_HASH_WORKERS,
+    HashingOverloaded,
+    HashingPool,
+    hash_password_sync,
+    check_password_sync,
+)
+
+PASSWORD = "benchmark-password"
+
+
+async def _client(call, deadline, latencies, outcomes):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        outcome = await call()
+        outcomes.append(outcome)
+        if outcome == "ok":  # 429s answer immediately; only completed logins count toward latency
+            latencies.append(time.perf_counter() - started)
+
+
+async def run_level(call, concurrency, duration):
+    latencies, outcomes = [], []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*[_client(call, deadline, latencies, outcomes) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    ok = sum(1 for o in outcomes if o == "ok")
+    lat_ms = np.asarray(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "logins_per_s": ok / elapsed,
+        "rejected": sum(1 for o in outcomes if o == "429"),
+        "errors": sum(1 for o in outcomes if o not in ("ok", "429")),
+        "p50_ms": float(np.percentile(lat_ms, 50)) if len(lat_ms) else 0.0,
+        "p99_ms": float(np.percentile(lat_ms, 99)) if len(lat_ms) else 0.0,
+    }
+
+
+def pool_caller(pool, hashed):
+    async def call():
+        try:
+            ok = await pool.run(check_password_sync, PASSWORD, hashed)
+        except HashingOverloaded:
+            # a real client would back off on 429; pause briefly so rejections don't spin
+            await asyncio.sleep(0.05)
+            return "429"
+        return "ok" if ok else "error"
+    return call
+
+
+async def http_caller(url):
+    import httpx
+
+    client = httpx.AsyncClient(base_url=url, timeout=60.0, limits=httpx.Limits(max_connections=None))
+    creds = {"email": f"bench-{uuid.uuid4().hex[:8]}@example.com", "password": PASSWORD}
+    (await client.post("/auth/register", json=creds)).raise_for_status()
+
+    async def call():
+        try:
+            r = await client.post("/auth/login", json=creds)
+        except Exception:
+            return "error"
+        if r.status_code == 429:
+            await asyncio.sleep(0.05)
+            return "429"
+        return "ok" if r.status_code == 200 else "error"
+    return client, call
+
+
+async def main(levels, duration, rounds, workers, max_pending, url):
+    client = None
+    if url:
+        client, call = await http_caller(url)
+        print(f"🚀 Logging in against {url}")
+    else:
+        hashed = hash_password_sync(PASSWORD, rounds=rounds)
+        pool = HashingPool(workers=workers, max_pending=max_pending)
+        call = pool_caller(pool, hashed)
+        print(f"🚀 bcrypt rounds={rounds}, workers={workers}, max_pending={max_pending}")
+
+    print(f"{'clients':>8} {'logins/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'429s':>7} {'errors':>7}")
+    try:
+        for level in levels:
+            r = await run_level(call, level, duration)
+            print(f"{r['concurrency']:>8} {r['logins_per_s']:>10.1f} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+                  f"{r['rejected']:>7} {r['errors']:>7}")
+    finally:
+        if client is not None:
+            await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark login throughput against concurrency")
+    parser.add_argument("--levels", default="1,2,4,8,16,32,64", help="comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per level")
+    parser.add_argument("--rounds", type=int, default=BCRYPT_ROUNDS, help="bcrypt work factor (pool mode)")
+    parser.add_argument("--workers", type=int, default=PASSWORD_HASH_WORKERS, help="hashing threads (pool mode)")
+    parser.add_argument("--max-pending", type=int, default=PASSWORD_HASH_MAX_PENDING, help="backpressure limit (pool mode)")
+    parser.add_argument("--url", default=None, help="benchmark a running API instead of the pool")
+    args = parser.parse_args()
+
+    levels = [int(x) for x in args.levels.split(",") if x.strip()]
+    asyncio.run(main(levels, args.duration, args.rounds, args.workers, args.max_pending, args.url))
@@ -0,0 +1,145 @@
+"""
+Accuracy vs latency of the int8 ONNX backend against the PyTorch models on a
+fixed corpus (built in, or one note per line from --corpus).
+
+  summarizer: ROUGE-L F1 of the ONNX summary against the PyTorch summary
+  sentiment:  label agreement
+  embedder:   mean cosine(PyTorch vector, ONNX vector) and nearest-neighbour
+              agreement within the corpus
+
+Run app/export_onnx.py first.
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.core.model_registry import load_embedder, load_summarizer, load_sentiment
+
+CORPUS = [
+    "Sprint planning ran long again. We agreed to cut the reporting feature and focus on the import bug that blocks two customers.",
+    "Great call with the design team today, the new onboarding flow tested really well with users.",
+    "The deploy failed twice because the migration locked the insights table; we need to split it into smaller steps.",
+    "Read a paper on retrieval augmented generation. Key idea: retrieve passages first, then condition generation on them.",
+    "Feeling frustrated that the benchmark numbers keep changing between runs. Need to pin CPU frequency and warm up.",
+    "Grocery list: oats, spinach, coffee beans, and something for Friday's dinner with Sam.",
+    "Customer interview: they export notes weekly into spreadsheets and want tags to survive the round trip.",
+    "Postgres autovacuum fell behind on the embeddings table; bloat doubled query time for semantic search.",
+    "Brainstorm: cluster notes by topic, then surface one representative note per cluster on the home page.",
+    "The quarterly review went fine. Revenue is flat but retention improved, and the team morale is good.",
+    "Tried the int8 model on my laptop and it was noticeably faster, but I have not checked whether the summaries got worse.",
+    "Meeting notes: Alice owns the API rate limiting, Bob handles the frontend pagination, and I will write the load test.",
+]
+
+
+def _timed(fn, items, batch_size):
+    # one warm-up call, then per-batch latency
+    fn(items[:batch_size])
+    latencies, outputs = [], []
+    for i in range(0, len(items), batch_size):
+        started = time.perf_counter()
+        outputs.extend(fn(items[i:i + batch_size]))
+        latencies.append(time.perf_counter() - started)
+    per_item_ms = sum(latencies) / len(items) * 1000
+    return outputs, per_item_ms, float(np.percentile(np.asarray(latencies) * 1000, 95))
+
+
+def rouge_l(a: str, b: str) -> float:
+    x, y = a.lower().split(), b.lower().split()
+    if not x or not y:
+        return 0.0
+    # LCS length by dynamic programming over tokens
+    prev = [0] * (len(y) + 1)
+    for tx in x:
+        cur = [0]
+        for j, ty in enumerate(y):
+            cur.append(prev[j] + 1 if tx == ty else max(prev[j + 1], cur[j]))
+        prev = cur
+    lcs = prev[-1]
+    if not lcs:
+        return 0.0
+    p, r = lcs / len(x), lcs / len(y)
+    return 2 * p * r / (p + r)
+
+
+def bench_summarizer(corpus, batch_size):
+    out = {}
+    for backend in ("torch", "onnx"):
+        model = load_summarizer(backend)
+        call = lambda texts: [o["summary_text"] for o in model(texts, max_length=64, min_length=10,
+                                                               do_sample=False, truncation=True)]
+        out[backend] = _timed(call, corpus, batch_size)
+    score = float(np.mean([rouge_l(t, o) for t, o in zip(out["torch"][0], out["onnx"][0])]))
+    return {"metric": "ROUGE-L vs torch", "score": score, **_latency(out)}
+
+
+def bench_sentiment(corpus, batch_size):
+    out = {}
+    for backend in ("torch", "onnx"):
+        model = load_sentiment(backend)
+        out[backend] = _timed(lambda texts: [o["label"] for o in model(texts, truncation=True)], corpus, batch_size)
+    score = float(np.mean([t == o for t, o in zip(out["torch"][0], out["onnx"][0])]))
+    return {"metric": "label agreement", "score": score, **_latency(out)}
+
+
+def bench_embedder(corpus, batch_size):
+    out = {}
+    for backend in ("torch", "onnx"):
+        model = load_embedder(backend)
+        out[backend] = _timed(lambda texts: list(model.encode(texts, normalize_embeddings=True)), corpus, batch_size)
+    t, o = np.asarray(out["torch"][0]), np.asarray(out["onnx"][0])
+    cosine = float(np.mean(np.sum(t * o, axis=1)))
+
+    def nearest(m):
+        sims = m @ m.T
+        np.fill_diagonal(sims, -np.inf)
+        return sims.argmax(axis=1)
+
+    nn_agree = float(np.mean(nearest(t) == nearest(o)))
+    return {"metric": "cosine vs torch", "score": cosine, "nn_agreement": nn_agree, **_latency(out)}
+
+
+def _latency(out):
+    return {
+        "torch_ms_per_item": out["torch"][1],
+        "onnx_ms_per_item": out["onnx"][1],
+        "torch_p95_batch_ms": out["torch"][2],
+        "onnx_p95_batch_ms": out["onnx"][2],
+        "speedup": out["torch"][1] / out["onnx"][1] if out["onnx"][1] else None,
+    }
+
+
+BENCHES = {"summarizer": bench_summarizer, "sentiment": bench_sentiment, "embedder": bench_embedder}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the ONNX int8 backend with PyTorch")
+    parser.add_argument("--models", default=",".join(BENCHES))
+    parser.add_argument("--corpus", default=None, help="text file, one note per line")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args()
+
+    corpus = CORPUS
+    if args.corpus:
+        with open(args.corpus) as f:
+            corpus = [line.strip() for line in f if line.strip()]
+
+    results = {}
+    print(f"{'model':<11} {'metric':<18} {'score':>7} {'torch ms':>9} {'onnx ms':>9} {'speedup':>8}")
+    for name in [m.strip() for m in args.models.split(",") if m.strip()]:
+        r = BENCHES[name](corpus, args.batch_size)
+        results[name] = r
+        print(f"{name:<11} {r['metric']:<18} {r['score']:>7.3f} {r['torch_ms_per_item']:>9.1f} "
+              f"{r['onnx_ms_per_item']:>9.1f} {r['speedup']:>7.2f}x")
+        if "nn_agreement" in r:
+            print(f"{'':<11} {'NN agreement':<18} {r['nn_agreement']:>7.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"corpus_size": len(corpus), "results": results}, f, indent=2)
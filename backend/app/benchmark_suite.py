@@ -0,0 +1,346 @@
+"""
+Benchmark suite for the hot paths, on reproducible synthetic corpora.
+
+Notes are generated with Faker from a fixed seed (the corpus of size n is a
+prefix of every larger one) around a handful of topics, so clustering and
+search see real structure. Workloads:
+
+  size-dependent (run once per --sizes entry):
+    embed            embed_texts in --batch-size batches (cold cache)
+    cluster_texts    cluster_texts over the whole corpus, embeddings cached
+                     as they are after enrichment
+    search           query embedding + top-10 lookup in a vector index of
+                     the corpus (VECTOR_INDEX_BACKEND), --queries queries
+  per-item (run once, on --samples notes):
+    analyze_text     summary + keywords + sentiment
+    extract_insights rule-based extraction on top of the NLP outputs
+    create           POST /insights/ against a running API (needs --url)
+
+Each row reports p50/p95/p99 latency per operation (a batch, a clustering
+run, a query, a note), throughput in notes (or queries) per second and the
+peak process RSS while the workload ran. The NLP cache runs memory-only so a
+run never writes to the shared nlp_cache table.
+
+--save stores the run in benchmark_results (with git revision and host
+fingerprint); --baseline also makes it this host's baseline for
+`app/check_benchmarks.py --check`.
+
+    python app/benchmark_suite.py                          # 100, 10k, 100k
+    python app/benchmark_suite.py --sizes 100 --workloads embed,search --json out.json
+    python app/benchmark_suite.py --workloads create --url http://127.0.0.1:8000
+    python app/benchmark_suite.py --sizes 100,10000 --save --baseline
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# before any app import: these are read at import time
+os.environ.setdefault("NLP_CACHE_DB", "0")
+os.environ.setdefault("NLP_CACHE_MAX_ENTRIES", "250000")
+
+import argparse
+import json
+import platform
+import random
+import threading
+import time
+import uuid
+
+import numpy as np
+
+SIZES = (100, 10_000, 100_000)
+SIZE_WORKLOADS = ("embed", "cluster_texts", "search")
+ITEM_WORKLOADS = ("analyze_text", "extract_insights", "create")
+WORKLOADS = SIZE_WORKLOADS + ITEM_WORKLOADS
+# registry entry whose model a workload times (recorded as model_name)
+WORKLOAD_MODELS = {"embed": "embedder", "cluster_texts": "embedder", "search": "embedder", "analyze_text": "summarizer"}
+
+TOPICS = {
+    "engineering": ["deploy", "migration", "postgres", "latency", "pipeline", "refactor", "regression", "index"],
+    "product": ["roadmap", "onboarding", "pricing", "feedback", "feature", "churn", "interview", "launch"],
+    "learning": ["paper", "course", "algorithm", "notes", "chapter", "exercise", "lecture", "transformer"],
+    "health": ["run", "sleep", "workout", "diet", "stretching", "doctor", "meditation", "steps"],
+    "finance": ["budget", "invoice", "savings", "taxes", "rent", "subscription", "expenses", "salary"],
+    "team": ["standup", "retro", "hiring", "offsite", "feedback", "mentoring", "review", "planning"],
+}
+VERBS = ["reviewed", "fixed", "planned", "discussed", "postponed", "finished", "questioned", "measured"]
+CLOSERS = [
+    "We should revisit this next week.",
+    "Need to follow up with {name} about the {word}.",
+    "Not sure the {word} is worth it?",
+    "Overall a good day for the {word}.",
+    "Decided to drop the {word} for now.",
+]
+
+
+# ---- corpus ----
+
+def make_corpus(n: int, seed: int = 42):
+    """n notes as dicts with title, content, tags; deterministic for a seed."""
+    from faker import Faker
+
+    fake = Faker()
+    fake.seed_instance(seed)
+    rng = random.Random(seed)
+    topics = list(TOPICS)
+    notes = []
+    for _ in range(n):
+        topic = rng.choice(topics)
+        words = TOPICS[topic]
+        sentences = []
+        for _ in range(rng.randint(2, 6)):
+            if rng.random() < 0.6:
+                sentences.append(f"{fake.first_name()} {rng.choice(VERBS)} the {rng.choice(words)} "
+                                 f"and the {rng.choice(words)} on {fake.day_of_week()}.")
+            else:
+                sentences.append(fake.sentence(nb_words=rng.randint(6, 14)))
+        sentences.append(rng.choice(CLOSERS).format(name=fake.first_name(), word=rng.choice(words)))
+        notes.append({"title": fake.catch_phrase(), "content": " ".join(sentences), "tags": topic})
+    return notes
+
+
+def make_queries(n: int, seed: int = 42):
+    rng = random.Random(seed + 1)
+    return [f"{rng.choice(VERBS)} {' '.join(rng.sample(rng.choice(list(TOPICS.values())), 2))}" for _ in range(n)]
+
+
+# ---- measurement ----
+
+class PeakRSS:
+    """Samples process RSS on a background thread; `.peak` is the max seen (bytes)."""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+
+    def _sample(self):
+        import psutil
+        proc = psutil.Process()
+        while True:
+            rss = proc.memory_info().rss
+            self.peak = rss if self.peak is None else max(self.peak, rss)
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        try:
+            import psutil  # noqa: F401
+        except ImportError:
+            return self
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if hasattr(self, "_thread"):
+            self._thread.join()
+
+
+def measure(workload, size, ops, batch_size=1, track_rss=True):
+    """
+    Time each callable in `ops` ((callable, items) pairs) once; `items` is how
+    many notes or queries the op processes, for throughput.
+    """
+    latencies, items = [], 0
+    with PeakRSS() as rss:
+        started = time.perf_counter()
+        for fn, n in ops:
+            t0 = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - t0)
+            items += n
+        elapsed = time.perf_counter() - started
+
+    lat_ms = np.asarray(latencies) * 1000
+    return {
+        "workload": workload,
+        "size": size,
+        "batch_size": batch_size,
+        "ops": len(latencies),
+        "p50_ms": round(float(np.percentile(lat_ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(lat_ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(lat_ms, 99)), 2),
+        "throughput": round(items / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": round(rss.peak / 1e6, 1) if track_rss and rss.peak else None,
+        "seconds": round(elapsed, 2),
+    }
+
+
+# ---- workloads ----
+
+def bench_embed(notes, args):
+    from app.core.clustering import embed_texts
+    from app.core.nlp_cache import cache
+
+    texts = [n["content"] for n in notes]
+    embed_texts(["warm-up"])
+    cache.clear_memory()  # smaller corpora are prefixes of this one
+    b = args.batch_size
+    return measure("embed", len(notes), [
+        (lambda chunk=texts[i:i + b]: embed_texts(chunk), len(texts[i:i + b])) for i in range(0, len(texts), b)
+    ], batch_size=b)
+
+
+def bench_cluster_texts(notes, args):
+    from app.core.clustering import cluster_texts, embed_texts
+
+    texts = [n["content"] for n in notes]
+    embed_texts(texts)  # cached, as after enrichment; a no-op when embed ran first
+    return measure("cluster_texts", len(notes), [
+        (lambda: cluster_texts(texts, method=args.method), len(texts)) for _ in range(args.repeats)
+    ])
+
+
+def bench_search(notes, args):
+    from app.core.clustering import embed_query, embed_texts
+    from app.core.vector_index import make_index
+
+    vectors = embed_texts([n["content"] for n in notes])
+    index = make_index(vectors.shape[1])
+    for insight_id, vec in enumerate(vectors, start=1):
+        index.upsert(insight_id, vec)
+
+    def query(q):
+        index.search(embed_query(q), k=10)
+
+    return measure("search", len(notes), [
+        (lambda q=q: query(q), 1) for q in make_queries(args.queries, args.seed)
+    ])
+
+
+def bench_analyze_text(notes, args):
+    from app.core.nlp import analyze_text
+
+    analyze_text("Warm-up note so every model is loaded before timing starts.")
+    return measure("analyze_text", len(notes), [
+        (lambda text=n["content"]: analyze_text(text), 1) for n in notes
+    ])
+
+
+def bench_extract_insights(notes, args):
+    from app.core.insight_extractor import extract_insights
+
+    # NLP outputs are stubbed from the note itself: this times the extractor only
+    return measure("extract_insights", len(notes), [
+        (lambda n=n: extract_insights(n["content"], summary=n["content"], sentiment="POSITIVE",
+                                      keywords=TOPICS[n["tags"]][:5]), 1)
+        for n in notes
+    ])
+
+
+def bench_create(notes, args):
+    import httpx
+
+    if not args.url:
+        print("   ⏭️  create skipped (needs --url of a running API)")
+        return None
+    creds = {"email": f"bench-{uuid.uuid4().hex[:8]}@example.com", "password": "benchmark-password"}
+    with httpx.Client(base_url=args.url, timeout=60.0) as client:
+        client.post("/auth/register", json=creds)
+        r = client.post("/auth/login", json=creds)
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        def post(note):
+            client.post("/insights/", json=note, headers=headers).raise_for_status()
+
+        # RSS here would be the client's, not the server's
+        return measure("create", len(notes), [(lambda n=n: post(n), 1) for n in notes], track_rss=False)
+
+
+BENCHES = {
+    "embed": bench_embed,
+    "cluster_texts": bench_cluster_texts,
+    "search": bench_search,
+    "analyze_text": bench_analyze_text,
+    "extract_insights": bench_extract_insights,
+    "create": bench_create,
+}
+
+
+# ---- CLI ----
+
+def device_label() -> str:
+    try:
+        from app.core.model_registry import torch_device
+        return "GPU" if torch_device() == "cuda" else "CPU"
+    except ImportError:  # onnx-only deployments
+        return "CPU"
+
+
+def save(results, baseline):
+    from app.core.benchmark_store import save_run
+    from app.core.model_registry import model_identity
+    from app.db import SessionLocal
+
+    for r in results:
+        model = WORKLOAD_MODELS.get(r["workload"])
+        r["model_name"] = "@".join(model_identity(model)) if model else None
+    db = SessionLocal()
+    try:
+        return save_run(db, results, device_label(), baseline=baseline)
+    finally:
+        db.close()
+
+
+def print_row(r):
+    rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] is not None else "-"
+    print(f"{r['workload']:<17} {r['size']:>7} {r['ops']:>5} {r['p50_ms']:>10} {r['p95_ms']:>10} "
+          f"{r['p99_ms']:>10} {r['throughput']:>10} {rss:>8}")
+
+
+def run(workloads, sizes, args):
+    results = []
+    print(f"{'workload':<17} {'size':>7} {'ops':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} "
+          f"{'items/s':>10} {'RSS MB':>8}")
+    sized = [w for w in SIZE_WORKLOADS if w in workloads]
+    for size in sizes if sized else ():
+        corpus = make_corpus(size, args.seed)
+        for name in sized:
+            results.append(BENCHES[name](corpus, args))
+            print_row(results[-1])
+
+    samples = make_corpus(args.samples, args.seed)
+    for name in [w for w in ITEM_WORKLOADS if w in workloads]:
+        r = BENCHES[name](samples, args)
+        if r is not None:
+            results.append(r)
+            print_row(r)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark InsightHub's hot paths on synthetic corpora")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help=f"comma-separated subset of {', '.join(WORKLOADS)}")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES), help="corpus sizes (notes)")
+    parser.add_argument("--samples", type=int, default=50, help="notes for the per-item workloads")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64, help="embedding batch size")
+    parser.add_argument("--repeats", type=int, default=3, help="cluster_texts runs per size")
+    parser.add_argument("--method", default="incremental", help="clustering method")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", default=None, help="running API for the create workload")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    parser.add_argument("--save", action="store_true", help="store the run in benchmark_results")
+    parser.add_argument("--baseline", action="store_true", help="store the run as this host's baseline")
+    args = parser.parse_args()
+
+    workloads = [w.strip() for w in args.workloads.split(",") if w.strip()]
+    unknown = [w for w in workloads if w not in BENCHES]
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(unknown)}")
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    print(f"⚙️  {platform.processor() or platform.machine()} | {os.cpu_count()} CPUs | "
+          f"Python {platform.python_version()} | seed {args.seed}\n")
+    results = run(workloads, sizes, args)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"seed": args.seed, "results": results}, f, indent=2)
+        print(f"\n📦 Wrote {len(results)} results to {args.json}")
+    if args.save or args.baseline:
+        run_id = save(results, args.baseline)
+        print(f"📦 Saved run {run_id}{' as baseline' if args.baseline else ''} to benchmark_results")
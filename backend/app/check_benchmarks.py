@@ -1,15 +1,133 @@
+"""
+Inspect stored benchmark results and check the latest run against a baseline.
+
+    python app/check_benchmarks.py                       # last rows
+    python app/check_benchmarks.py --runs                # recorded runs
+    python app/check_benchmarks.py --set-baseline latest
+    python app/check_benchmarks.py --check --tolerance 0.15 --metric-tolerance p99_ms=0.3
+
+--check compares the latest run on this host (or --run) with this host's
+baseline and exits 1 when any metric regressed beyond the tolerance
+(BENCHMARK_TOLERANCE, default 10%), 2 when there is nothing to compare.
+"""
 import sys, os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import argparse
+
 from app.db import SessionLocal
 from app.models.benchmark import BenchmarkResult
+from app.core.benchmark_store import (
+    BENCHMARK_TOLERANCE,
+    METRICS,
+    baseline_run_id,
+    compare_runs,
+    host_fingerprint,
+    latest_run_id,
+    list_runs,
+    run_rows,
+    set_baseline,
+)
+
+
+def _fmt(value):
+    if value is None:
+        return "-"
+    return f"{value:.4g}" if isinstance(value, float) else str(value)
+
+
+def show_rows(db, limit):
+    print("\n📊 Benchmark Results in DB:\n" + "-" * 50)
+    for b in db.query(BenchmarkResult).order_by(BenchmarkResult.id.desc()).limit(limit).all():
+        print(f"ID: {b.id} | Workload: {b.workload} | Model: {b.model_name} | Device: {b.device} | "
+              f"Size: {_fmt(b.corpus_size)} | Batch: {_fmt(b.batch_size)} | Avg Time: {_fmt(b.avg_time)}s | "
+              f"p50/p95/p99: {_fmt(b.p50_ms)}/{_fmt(b.p95_ms)}/{_fmt(b.p99_ms)} ms | "
+              f"Throughput: {_fmt(b.throughput)}/s | Peak RSS: {_fmt(b.peak_rss_mb)}MB | "
+              f"VRAM Used: {_fmt(b.vram_used_gb)}GB | Rev: {b.git_revision} | Date: {b.run_date}")
+
+
+def show_runs(db, limit):
+    print(f"{'run':<34} {'date':<20} {'revision':<14} {'host':<17} {'rows':>5}")
+    for r in list_runs(db, limit):
+        date = r.run_date.strftime("%Y-%m-%d %H:%M") if r.run_date else "-"
+        flag = "  ⭐ baseline" if r.is_baseline else ""
+        print(f"{r.run_id:<34} {date:<20} {r.git_revision or '-':<14} {r.host_fingerprint or '-':<17} {r.rows:>5}{flag}")
+
+
+def check(db, run_id, tolerance, tolerances):
+    host = host_fingerprint()
+    baseline = baseline_run_id(db, host)
+    if baseline is None:
+        print(f"❌ No baseline for this host ({host}); run the suite with --baseline or use --set-baseline")
+        return 2
+    run_id = run_id or latest_run_id(db, host)
+    if run_id is None or run_id == baseline:
+        print("❌ No run newer than the baseline to compare")
+        return 2
+
+    latest = run_rows(db, run_id)
+    comparisons = compare_runs(run_rows(db, baseline), latest, tolerance, tolerances)
+    if not comparisons:
+        print(f"❌ Run {run_id} shares no workloads with baseline {baseline}")
+        return 2
+
+    revisions = {row.git_revision for row in latest}
+    print(f"🔍 {run_id} ({', '.join(sorted(r or '-' for r in revisions))}) vs baseline {baseline}, "
+          f"tolerance {tolerance:.0%}\n")
+    print(f"{'workload':<17} {'size':>7} {'batch':>5} {'metric':<12} {'baseline':>11} {'latest':>11} {'change':>8}")
+    regressions = 0
+    for c in comparisons:
+        change = f"{c['change']:+.1%}" if c["change"] is not None else "-"
+        mark = "  ❌" if c["regressed"] else ""
+        regressions += c["regressed"]
+        print(f"{c['workload'] or '-':<17} {_fmt(c['corpus_size']):>7} {_fmt(c['batch_size']):>5} {c['metric']:<12} "
+              f"{_fmt(c['baseline']):>11} {_fmt(c['latest']):>11} {change:>8}{mark}")
+
+    if regressions:
+        print(f"\n❌ {regressions} metric(s) regressed beyond tolerance")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+def _metric_tolerances(values, parser):
+    out = {}
+    for item in values:
+        metric, _, value = item.partition("=")
+        if metric not in METRICS or not value:
+            parser.error(f"--metric-tolerance expects METRIC=FRACTION with METRIC one of {', '.join(METRICS)}")
+        out[metric] = float(value)
+    return out
 
-db = SessionLocal()
 
-print("\n📊 Benchmark Results in DB:\n" + "-"*50)
-for b in db.query(BenchmarkResult).order_by(BenchmarkResult.id.desc()).limit(5).all():
-    print(f"ID: {b.id} | Model: {b.model_name} | Device: {b.device} | "
-          f"Avg Time: {b.avg_time}s | VRAM Used: {b.vram_used_gb}GB | Date: {b.run_date}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show benchmark results or check for regressions")
+    parser.add_argument("--limit", type=int, default=5, help="rows (or runs) to show")
+    parser.add_argument("--runs", action="store_true", help="list recorded runs")
+    parser.add_argument("--set-baseline", metavar="RUN_ID", help="run id, or 'latest' for this host's latest run")
+    parser.add_argument("--check", action="store_true", help="compare a run with the baseline")
+    parser.add_argument("--run", default=None, help="run to check (default: latest on this host)")
+    parser.add_argument("--tolerance", type=float, default=BENCHMARK_TOLERANCE, help="allowed relative regression")
+    parser.add_argument("--metric-tolerance", action="append", default=[], metavar="METRIC=FRACTION",
+                        help="per-metric override, repeatable")
+    args = parser.parse_args()
+    tolerances = _metric_tolerances(args.metric_tolerance, parser)
 
-db.close()
+    db = SessionLocal()
+    try:
+        if args.set_baseline:
+            run_id = latest_run_id(db, host_fingerprint()) if args.set_baseline == "latest" else args.set_baseline
+            marked = set_baseline(db, run_id) if run_id else 0
+            if not marked:
+                print(f"❌ No benchmark run {args.set_baseline}")
+                sys.exit(2)
+            print(f"⭐ Run {run_id} is now the baseline ({marked} rows)")
+        elif args.check:
+            sys.exit(check(db, args.run, args.tolerance, tolerances))
+        elif args.runs:
+            show_runs(db, args.limit)
+        else:
+            show_rows(db, args.limit)
+    finally:
+        db.close()
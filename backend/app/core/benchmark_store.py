@@ -0,0 +1,213 @@
+# app/core/benchmark_store.py
+"""
+Benchmark runs in the benchmark_results table, and regression checks
+between them.
+
+Every row of a run shares a run_id and records the git revision it was
+measured on and a host fingerprint (hash of CPU model, core count, memory
+and Python version), since timings are only comparable on the same kind of
+machine. One run per host fingerprint can be marked as the baseline;
+`compare_runs` lines the latest run up against it by (workload, corpus size,
+batch size, device) and flags every metric that got worse by more than the
+tolerance:
+
+  - latency (avg_time, p50/p95/p99) and peak_rss_mb: regress when they grow
+  - throughput: regresses when it drops
+
+Latency changes smaller than BENCHMARK_MIN_DELTA_MS are ignored whatever
+the ratio, so sub-millisecond timer noise does not fail a check.
+"""
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import uuid
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.benchmark import BenchmarkResult
+
+BENCHMARK_TOLERANCE = float(os.getenv("BENCHMARK_TOLERANCE", "0.10"))
+BENCHMARK_MIN_DELTA_MS = float(os.getenv("BENCHMARK_MIN_DELTA_MS", "0.5"))
+
+LOWER_IS_BETTER = ("avg_time", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb")
+HIGHER_IS_BETTER = ("throughput",)
+METRICS = LOWER_IS_BETTER + HIGHER_IS_BETTER
+
+
+def git_revision() -> Optional[str]:
+    """Short HEAD hash (+ "-dirty" with uncommitted changes); GIT_REVISION wins when set."""
+    if os.getenv("GIT_REVISION"):
+        return os.getenv("GIT_REVISION")
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=cwd, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{rev}-dirty" if dirty else rev
+
+
+def host_info() -> dict:
+    info = {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": platform.system(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+    try:
+        import psutil
+        info["memory_gb"] = round(psutil.virtual_memory().total / 1e9)
+    except ImportError:
+        pass
+    return info
+
+
+def host_fingerprint(info: Optional[dict] = None) -> str:
+    raw = json.dumps(info or host_info(), sort_keys=True).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def save_run(db: Session, results: List[dict], device: str, baseline: bool = False) -> str:
+    """
+    Store one row per result dict (as produced by app/benchmark_suite.py) under
+    a new run id and return it. With `baseline`, the run replaces this host's
+    baseline.
+    """
+    run_id = uuid.uuid4().hex
+    revision, fingerprint = git_revision(), host_fingerprint()
+    db.add_all([
+        BenchmarkResult(
+            run_id=run_id,
+            workload=r["workload"],
+            model_name=r.get("model_name"),
+            device=device,
+            corpus_size=r.get("size"),
+            batch_size=r.get("batch_size"),
+            avg_time=r["seconds"] / r["ops"] if r.get("ops") else r["p50_ms"] / 1000,
+            p50_ms=r.get("p50_ms"),
+            p95_ms=r.get("p95_ms"),
+            p99_ms=r.get("p99_ms"),
+            throughput=r.get("throughput"),
+            peak_rss_mb=r.get("peak_rss_mb"),
+            git_revision=revision,
+            host_fingerprint=fingerprint,
+        )
+        for r in results
+    ])
+    db.flush()
+    if baseline:
+        set_baseline(db, run_id)
+    db.commit()
+    return run_id
+
+
+def set_baseline(db: Session, run_id: str) -> int:
+    """Make `run_id` the baseline of its host; returns the number of rows marked."""
+    fingerprint = db.execute(
+        select(BenchmarkResult.host_fingerprint).where(BenchmarkResult.run_id == run_id).limit(1)
+    ).scalar()
+    db.execute(
+        update(BenchmarkResult)
+        .where(BenchmarkResult.host_fingerprint == fingerprint, BenchmarkResult.is_baseline.is_(True))
+        .values(is_baseline=False)
+    )
+    marked = db.execute(
+        update(BenchmarkResult).where(BenchmarkResult.run_id == run_id).values(is_baseline=True)
+    ).rowcount
+    db.commit()
+    return marked
+
+
+def list_runs(db: Session, limit: int = 20) -> list:
+    """Most recent runs first: (run_id, started, revision, host, rows, is_baseline)."""
+    return db.execute(
+        select(
+            BenchmarkResult.run_id,
+            func.min(BenchmarkResult.run_date).label("run_date"),
+            func.max(BenchmarkResult.git_revision).label("git_revision"),
+            func.max(BenchmarkResult.host_fingerprint).label("host_fingerprint"),
+            func.count().label("rows"),
+            func.max(case((BenchmarkResult.is_baseline, 1), else_=0)).label("is_baseline"),
+        )
+        .where(BenchmarkResult.run_id.is_not(None))
+        .group_by(BenchmarkResult.run_id)
+        .order_by(func.min(BenchmarkResult.run_date).desc())
+        .limit(limit)
+    ).all()
+
+
+def latest_run_id(db: Session, host: Optional[str] = None) -> Optional[str]:
+    stmt = select(BenchmarkResult.run_id).where(BenchmarkResult.run_id.is_not(None))
+    if host:
+        stmt = stmt.where(BenchmarkResult.host_fingerprint == host)
+    return db.execute(stmt.order_by(BenchmarkResult.id.desc()).limit(1)).scalar()
+
+
+def baseline_run_id(db: Session, host: str) -> Optional[str]:
+    return db.execute(
+        select(BenchmarkResult.run_id)
+        .where(BenchmarkResult.host_fingerprint == host, BenchmarkResult.is_baseline.is_(True))
+        .limit(1)
+    ).scalar()
+
+
+def run_rows(db: Session, run_id: str) -> List[BenchmarkResult]:
+    return db.execute(
+        select(BenchmarkResult).where(BenchmarkResult.run_id == run_id).order_by(BenchmarkResult.id)
+    ).scalars().all()
+
+
+def _key(row: BenchmarkResult):
+    return row.workload, row.corpus_size, row.batch_size, row.device
+
+
+def _regressed(metric: str, base: float, latest: float, tolerance: float) -> bool:
+    if metric in HIGHER_IS_BETTER:
+        return latest < base * (1 - tolerance)
+    if latest <= base * (1 + tolerance):
+        return False
+    if metric == "avg_time":
+        return (latest - base) * 1000 >= BENCHMARK_MIN_DELTA_MS
+    if metric.endswith("_ms"):
+        return latest - base >= BENCHMARK_MIN_DELTA_MS
+    return True
+
+
+def compare_runs(baseline: List[BenchmarkResult], latest: List[BenchmarkResult],
+                 tolerance: float = BENCHMARK_TOLERANCE,
+                 tolerances: Optional[Dict[str, float]] = None) -> List[dict]:
+    """
+    One entry per metric present in both runs for a matching workload row:
+    {workload, corpus_size, batch_size, device, metric, baseline, latest,
+    change (relative), regressed}. `tolerances` overrides `tolerance` per metric.
+    """
+    tolerances = tolerances or {}
+    base_by_key = {_key(row): row for row in baseline}
+    out = []
+    for row in latest:
+        base = base_by_key.get(_key(row))
+        if base is None:
+            continue
+        for metric in METRICS:
+            b, l = getattr(base, metric), getattr(row, metric)
+            if b is None or l is None:
+                continue
+            out.append({
+                "workload": row.workload,
+                "corpus_size": row.corpus_size,
+                "batch_size": row.batch_size,
+                "device": row.device,
+                "metric": metric,
+                "baseline": b,
+                "latest": l,
+                "change": (l - b) / b if b else None,
+                "regressed": _regressed(metric, b, l, tolerances.get(metric, tolerance)),
+            })
+    return out
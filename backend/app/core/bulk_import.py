@@ -0,0 +1,170 @@
+# app/core/bulk_import.py
+"""
+Bulk insight import.
+
+Records (NDJSON objects or CSV rows with title/content/tags) are processed
+in batches of `batch_size`: one analyze_texts pass (summary, keywords,
+sentiment), one embed_texts pass over the summaries, one multi-row INSERT for
+the insights, then the batch joins the user's persisted clusters
+incrementally (one multi-row INSERT of the embeddings, cluster ids included)
+and is committed. Existing insights are never re-embedded or re-clustered.
+With method="agglomerative" the embeddings are written unassigned instead
+and one full recluster of the user runs after the last batch.
+
+`import_records` is a generator of progress events, one per record plus a
+final summary, so callers can stream them back (the HTTP endpoint) or print
+them (app/import_insights.py).
+"""
+import csv
+import json
+import logging
+import time
+from itertools import islice
+from typing import IO, Iterable, Iterator
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.models.insight import Insight
+from app.models.embedding import InsightEmbedding
+from app.models.cluster import InsightCluster
+from app.core.clustering import DEFAULT_THRESHOLD, embed_texts
+from app.core.cluster_service import assign_new_insights, recluster_user
+from app.core.vector_index import drop_user_index
+from app.core.nlp import analyze_texts
+from app.core.nlp_cache import text_hash
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("ndjson", "csv")
+TITLE_FROM_CONTENT_CHARS = 80
+
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[tuple]:
+    """Yield (line number, record dict or None, error or None) from a text stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+    if fmt != "ndjson":
+        raise ValueError(f"Unknown import format {fmt!r}; expected one of {IMPORT_FORMATS}")
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_no, None, f"invalid JSON: {exc.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "expected a JSON object"
+            continue
+        yield line_no, record, None
+
+
+def _clean(record: dict):
+    """(title, content, tags) or raises ValueError"""
+    content = (record.get("content") or "").strip()
+    if not content:
+        raise ValueError("content is required")
+    title = (record.get("title") or "").strip() or content.splitlines()[0][:TITLE_FROM_CONTENT_CHARS]
+    tags = record.get("tags")
+    if isinstance(tags, list):
+        tags = ",".join(str(t) for t in tags)
+    return title, content, (tags or None)
+
+
+def _import_batch(db: Session, user_id: int, batch: list, threshold: float, method: str) -> Iterator[dict]:
+    valid = []
+    for line_no, record, error in batch:
+        if error is None:
+            try:
+                valid.append((line_no, _clean(record)))
+            except ValueError as exc:
+                error = str(exc)
+        if error is not None:
+            yield {"line": line_no, "status": "error", "error": error}
+    if not valid:
+        return
+
+    contents = [content for _, (_, content, _) in valid]
+    try:
+        analyses = analyze_texts(contents)
+        vectors = embed_texts([a["summary"] for a in analyses])
+        ids = db.execute(
+            insert(Insight).returning(Insight.id, sort_by_parameter_order=True),
+            [
+                {
+                    "title": title,
+                    "content": content,
+                    "content_hash": text_hash(content),
+                    "tags": tags,
+                    "summary": a["summary"],
+                    "keywords": ",".join(a["keywords"]),
+                    "sentiment": a["sentiment"],
+                    "enrichment_status": "done",
+                    "user_id": user_id,
+                }
+                for (_, (title, content, tags)), a in zip(valid, analyses)
+            ],
+        ).scalars().all()
+        if method == "incremental":
+            assign_new_insights(db, user_id, ids, vectors, threshold=threshold)
+        else:
+            # cluster ids are filled in by the single recluster at the end
+            db.execute(insert(InsightEmbedding), [
+                {"insight_id": insight_id, "vector": vec, "cluster_id": None}
+                for insight_id, vec in zip(ids, vectors)
+            ])
+        db.commit()
+        drop_user_index(user_id)
+    except Exception as exc:
+        db.rollback()
+        logger.exception("Import batch failed")
+        for line_no, _ in valid:
+            yield {"line": line_no, "status": "error", "error": f"batch failed: {exc!r}"[:500]}
+        return
+
+    for (line_no, _), insight_id in zip(valid, ids):
+        yield {"line": line_no, "status": "ok", "id": insight_id}
+
+
+def _batches(records: Iterable, size: int):
+    it = iter(records)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def import_records(db: Session, user_id: int, records: Iterable[tuple], batch_size: int = 64,
+                   threshold: float = DEFAULT_THRESHOLD, method: str = "incremental") -> Iterator[dict]:
+    """Import `records` (as produced by read_records) for `user_id`, yielding progress events."""
+    started = time.perf_counter()
+    imported = failed = 0
+    for batch in _batches(records, batch_size):
+        for event in _import_batch(db, user_id, batch, threshold, method):
+            if event["status"] == "ok":
+                imported += 1
+            else:
+                failed += 1
+            yield event
+
+    clusters = None
+    if imported and method != "incremental":
+        yield {"status": "clustering"}
+        clusters = recluster_user(db, user_id, threshold=threshold, method=method)
+    elif imported:
+        clusters = db.query(func.count(InsightCluster.id)).filter(InsightCluster.user_id == user_id).scalar()
+
+    elapsed = time.perf_counter() - started
+    yield {
+        "status": "done",
+        "imported": imported,
+        "failed": failed,
+        "clusters": clusters,
+        "seconds": round(elapsed, 2),
+        "records_per_second": round((imported + failed) / elapsed, 1) if elapsed else None,
+    }
@@ -0,0 +1,307 @@
+# app/core/cluster_service.py
+"""
+DB-side clustering operations.
+
+Every user's clusters live in `insight_clusters` (running-mean centroid,
+member count, representative insight). `assign_insight` / `remove_insight`
+keep that table current with O(1) count-weighted updates, so the write path
+only embeds the affected insight; `assign_new_insights` does the same for a
+batch of imported insights. `recluster_user` rebuilds every cluster of
+a user from scratch and is only meant to run in the background / offline.
+
+Every writer of a user's clusters (assign, remove, recluster and the offline
+app/assign_clusters.py) first takes `lock_user_clusters`, a transaction-scoped
+Postgres advisory lock per user. Row locks alone cannot serialize them: a user
+without clusters has no rows to lock, and new cluster ids are max + 1.
+"""
+from typing import List
+
+import numpy as np
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session, aliased
+
+from app.db import SessionLocal
+from app.models.insight import Insight
+from app.models.embedding import InsightEmbedding
+from app.models.cluster import InsightCluster
+from app.core.clustering import (
+    DEFAULT_THRESHOLD,
+    embed_texts,
+    generate_embedding,
+    assign_to_centroid,
+    centroid_add,
+    centroid_remove,
+    cluster_embeddings,
+    summarize_members,
+)
+from app.core.vector_index import index_upsert, drop_user_index
+
+
+# first key of pg_advisory_xact_lock(key1, key2); the user id is the second
+CLUSTER_LOCK_NAMESPACE = 7301
+
+
+def lock_user_clusters(db: Session, user_id: int):
+    """Serialize cluster writes for `user_id` until the current transaction ends."""
+    db.execute(select(func.pg_advisory_xact_lock(CLUSTER_LOCK_NAMESPACE, user_id)))
+
+
+def _cosine(a, b) -> float:
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(np.dot(a, b) / denom) if denom else 0.0
+
+
+def _add_member(cluster: InsightCluster, insight_id: int, vec):
+    centroid = centroid_add(cluster.centroid, cluster.member_count, vec)
+    cluster.centroid = centroid.tolist()
+    cluster.member_count += 1
+
+    # representative = member closest to the centroid; checked against the new member only
+    score = _cosine(vec, centroid)
+    if cluster.representative_insight_id is None or score > (cluster.representative_score or -1.0):
+        cluster.representative_insight_id = insight_id
+        cluster.representative_score = score
+
+
+def _pick_representative(db: Session, user_id: int, cluster: InsightCluster):
+    """Re-select the representative among the remaining members of one cluster."""
+    members = (
+        db.query(InsightEmbedding.insight_id, InsightEmbedding.vector)
+        .join(Insight, Insight.id == InsightEmbedding.insight_id)
+        .filter(Insight.user_id == user_id, InsightEmbedding.cluster_id == cluster.cluster_id)
+        .all()
+    )
+    best_id, best_score = None, None
+    for insight_id, vector in members:
+        score = _cosine(vector, cluster.centroid)
+        if best_score is None or score > best_score:
+            best_id, best_score = insight_id, score
+    cluster.representative_insight_id = best_id
+    cluster.representative_score = best_score
+
+
+def _remove_member(db: Session, user_id: int, embedding: InsightEmbedding):
+    if embedding.cluster_id is None:
+        return
+    cluster = (
+        db.query(InsightCluster)
+        .filter(InsightCluster.user_id == user_id, InsightCluster.cluster_id == embedding.cluster_id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+    if cluster is None:
+        return
+
+    centroid = centroid_remove(cluster.centroid, cluster.member_count, embedding.vector)
+    if centroid is None:
+        db.delete(cluster)
+        return
+
+    cluster.centroid = centroid.tolist()
+    cluster.member_count -= 1
+    if cluster.representative_insight_id == embedding.insight_id:
+        # flush so the departing member's row no longer counts
+        embedding.cluster_id = None
+        db.flush()
+        _pick_representative(db, user_id, cluster)
+
+
+def _next_cluster_id(db: Session, user_id: int) -> int:
+    """max + 1 over the committed clusters; only valid under lock_user_clusters."""
+    current = db.query(func.max(InsightCluster.cluster_id)).filter(InsightCluster.user_id == user_id).scalar()
+    return (current or 0) + 1
+
+
+def assign_insight(db: Session, insight: Insight, threshold: float = DEFAULT_THRESHOLD, vec=None) -> InsightEmbedding:
+    """
+    Embed `insight` (unless `vec` is given) and store a single InsightEmbedding
+    row for it, assigned to the nearest persisted cluster of the same user or
+    to a new one. A previous assignment of the same insight is undone first,
+    so this also handles updates.
+    """
+    if vec is None:
+        vec = generate_embedding(insight.summary or "")
+    vec = np.asarray(vec, dtype=np.float32)
+
+    # before any cluster row is read or locked, so every writer locks in the same order
+    lock_user_clusters(db, insight.user_id)
+    existing = db.query(InsightEmbedding).filter(InsightEmbedding.insight_id == insight.id).first()
+    if existing is not None:
+        _remove_member(db, insight.user_id, existing)
+        db.delete(existing)
+        db.flush()
+
+    clusters: List[InsightCluster] = (
+        db.query(InsightCluster)
+        .filter(InsightCluster.user_id == insight.user_id)
+        .order_by(InsightCluster.cluster_id)
+        .with_for_update()
+        .populate_existing()  # centroids and counts as committed, not as this session last saw them
+        .all()
+    )
+    centroids = np.asarray([c.centroid for c in clusters], dtype=np.float32)
+
+    best = assign_to_centroid(vec, centroids, threshold=threshold)
+    if best is None:
+        cluster = InsightCluster(
+            user_id=insight.user_id,
+            cluster_id=_next_cluster_id(db, insight.user_id),
+            centroid=vec.tolist(),
+            member_count=0,
+        )
+        db.add(cluster)
+    else:
+        cluster = clusters[best]
+    _add_member(cluster, insight.id, vec)
+
+    entry = InsightEmbedding(insight_id=insight.id, vector=vec.tolist(), cluster_id=cluster.cluster_id)
+    db.add(entry)
+    db.commit()
+    index_upsert(insight.user_id, insight.id, vec, entry.id)
+    return entry
+
+
+def assign_new_insights(db: Session, user_id: int, insight_ids: List[int], vectors,
+                        threshold: float = DEFAULT_THRESHOLD) -> int:
+    """
+    assign_insight for a batch of new, not yet embedded insights of one user
+    whose vectors are already computed: one lock, one read of the clusters,
+    then each vector joins its nearest cluster (or opens one) in order, and
+    the embedding rows are written once, with their cluster ids, in a single
+    multi-row INSERT. The caller commits; returns the user's cluster count.
+    """
+    lock_user_clusters(db, user_id)
+    clusters: List[InsightCluster] = (
+        db.query(InsightCluster)
+        .filter(InsightCluster.user_id == user_id)
+        .order_by(InsightCluster.cluster_id)
+        .with_for_update()
+        .populate_existing()
+        .all()
+    )
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = np.asarray([c.centroid for c in clusters], dtype=np.float32).reshape(-1, vectors.shape[1])
+    next_id = _next_cluster_id(db, user_id)
+
+    rows = []
+    for insight_id, vec in zip(insight_ids, vectors):
+        best = assign_to_centroid(vec, centroids, threshold=threshold)
+        if best is None:
+            cluster = InsightCluster(user_id=user_id, cluster_id=next_id, centroid=vec.tolist(), member_count=0)
+            db.add(cluster)
+            clusters.append(cluster)
+            centroids = np.vstack([centroids, vec[None, :]])
+            best, next_id = len(clusters) - 1, next_id + 1
+        cluster = clusters[best]
+        _add_member(cluster, insight_id, vec)
+        centroids[best] = cluster.centroid
+        rows.append({"insight_id": insight_id, "vector": vec.tolist(), "cluster_id": cluster.cluster_id})
+
+    if rows:
+        db.execute(insert(InsightEmbedding), rows)
+    return len(clusters)
+
+
+def remove_insight(db: Session, insight: Insight):
+    """
+    Take `insight` out of its cluster; call before deleting the insight. The
+    caller commits and then calls `index_remove`, so a rolled-back delete
+    leaves the cached search index untouched.
+    """
+    lock_user_clusters(db, insight.user_id)
+    existing = db.query(InsightEmbedding).filter(InsightEmbedding.insight_id == insight.id).first()
+    if existing is not None:
+        _remove_member(db, insight.user_id, existing)
+
+
+def get_user_clusters(db: Session, user_id: int) -> List[dict]:
+    """
+    Clusters of `user_id` in the /insights/clusters shape, read in a single
+    query from the persisted tables (no embedding or clustering work).
+    """
+    rep = aliased(Insight)
+    rows = (
+        db.query(
+            InsightCluster.cluster_id,
+            func.array_agg(InsightEmbedding.insight_id),
+            rep.summary,
+        )
+        .join(Insight, Insight.user_id == InsightCluster.user_id)
+        .join(
+            InsightEmbedding,
+            (InsightEmbedding.insight_id == Insight.id) & (InsightEmbedding.cluster_id == InsightCluster.cluster_id),
+        )
+        .outerjoin(rep, rep.id == InsightCluster.representative_insight_id)
+        .filter(InsightCluster.user_id == user_id)
+        .group_by(InsightCluster.cluster_id, rep.summary)
+        .order_by(InsightCluster.cluster_id)
+        .all()
+    )
+    return [
+        {'cluster_id': cluster_id, 'insight_ids': sorted(insight_ids), 'representative': representative}
+        for cluster_id, insight_ids, representative in rows
+    ]
+
+
+def recluster_user(db: Session, user_id: int, threshold: float = DEFAULT_THRESHOLD,
+                   method: str = "incremental") -> int:
+    """
+    Full re-cluster of one user's insights. Every summary is encoded once and
+    the user's embedding and cluster rows are replaced. `method` is passed to
+    cluster_embeddings. Returns the number of clusters.
+    """
+    lock_user_clusters(db, user_id)
+    insights = db.query(Insight.id, Insight.summary).filter(Insight.user_id == user_id).all()
+    db.query(InsightCluster).filter(InsightCluster.user_id == user_id).delete(synchronize_session=False)
+    if not insights:
+        db.commit()
+        return 0
+
+    ids = [ins.id for ins in insights]
+    texts = [ins.summary or "" for ins in insights]
+    embeddings = embed_texts(texts)
+    clusters = cluster_embeddings(embeddings, texts, insight_ids=ids, threshold=threshold, method=method)
+    write_user_clusters(db, user_id, ids, embeddings, clusters)
+    db.commit()
+    return len(clusters)
+
+
+def write_user_clusters(db: Session, user_id: int, ids: List[int], embeddings: np.ndarray, clusters: List[dict]):
+    """Replace the embedding rows of `ids` and insert one InsightCluster per cluster."""
+    row_of = {insight_id: i for i, insight_id in enumerate(ids)}
+    assigned = {}
+    cluster_rows = []
+    for c in clusters:
+        rows = [row_of[insight_id] for insight_id in c['insight_ids']]
+        for insight_id in c['insight_ids']:
+            assigned[insight_id] = c['cluster_id']
+
+        centroid, best, score = summarize_members(embeddings[rows])
+        cluster_rows.append(InsightCluster(
+            user_id=user_id,
+            cluster_id=c['cluster_id'],
+            centroid=centroid.tolist(),
+            member_count=len(rows),
+            representative_insight_id=c['insight_ids'][best],
+            representative_score=score,
+        ))
+
+    db.query(InsightEmbedding).filter(InsightEmbedding.insight_id.in_(ids)).delete(synchronize_session=False)
+    db.bulk_save_objects([
+        InsightEmbedding(insight_id=insight_id, vector=vec.tolist(), cluster_id=assigned.get(insight_id))
+        for insight_id, vec in zip(ids, embeddings)
+    ])
+    db.bulk_save_objects(cluster_rows)
+    drop_user_index(user_id)
+
+
+def recluster_user_job(user_id: int, threshold: float = DEFAULT_THRESHOLD, method: str = "incremental"):
+    """Background-task entry point: runs recluster_user with its own session."""
+    db = SessionLocal()
+    try:
+        recluster_user(db, user_id, threshold=threshold, method=method)
+    finally:
+        db.close()
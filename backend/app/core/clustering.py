@@ -1,58 +1,217 @@
 # app/core/clustering.py
-import torch
+import os
+import threading
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 from typing import List, Optional
 
-# Use GPU if available
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
-EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
-embedder = SentenceTransformer(EMBED_MODEL_NAME, device=DEVICE)
+from app.core.model_registry import get_embedder, model_identity
+from app.core.nlp_cache import NlpCache, cache
+
+EMBEDDING_KIND = "embedding/v1"
+CANDIDATE_KIND = "embedding/candidate/v1"
+
+# KeyBERT candidate words repeat across notes but are far too many to persist,
+# so their vectors live in a memory-only cache of their own
+CANDIDATE_CACHE_MAX_ENTRIES = int(os.getenv("CANDIDATE_CACHE_MAX_ENTRIES", "50000"))
+candidate_cache = NlpCache(max_entries=CANDIDATE_CACHE_MAX_ENTRIES, use_db=False)
+
+DEFAULT_THRESHOLD = 0.65
+CLUSTER_METHODS = ("incremental", "agglomerative")
+
+_encoder_lock = threading.Lock()
+_encoder_counts = {"calls": 0, "texts": 0}
+
+def _encode(texts: List[str]) -> List[np.ndarray]:
+    with _encoder_lock:
+        _encoder_counts["calls"] += 1
+        _encoder_counts["texts"] += len(texts)
+    return list(np.asarray(get_embedder().encode(texts, show_progress_bar=False), dtype=np.float32))
+
+def encoder_stats() -> dict:
+    """Embedder forward passes (and texts encoded) since start, plus the candidate cache."""
+    with _encoder_lock:
+        counts = dict(_encoder_counts)
+    return {**counts, "candidate_cache": candidate_cache.stats()}
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """
+    Encode `texts` in a single batched call; returns array of shape (n, d).
+    Texts seen before (same model + revision) come from the NLP cache.
+    """
+    texts = [t or "" for t in texts]
+    if not texts:
+        return np.empty((0, get_embedder().get_sentence_embedding_dimension()), dtype=np.float32)
+    name, revision = model_identity("embedder")
+    return np.vstack(cache.get_or_compute(EMBEDDING_KIND, name, revision, texts, _encode))
+
+def embed_candidates(words: List[str]) -> np.ndarray:
+    """Like embed_texts, for keyword candidates (memory-only cache)."""
+    name, revision = model_identity("embedder")
+    return np.vstack(candidate_cache.get_or_compute(CANDIDATE_KIND, name, revision, list(words), _encode))
 
 def generate_embedding(text: str):
     """Return 1-D Python list (floats) embedding for `text`"""
-    # ensure text is a str
-    if text is None:
-        text = ""
-    vec = embedder.encode([text], show_progress_bar=False)[0]
-    return vec.tolist()
+    return embed_texts([text])[0].tolist()
+
+def embed_query(text: str):
+    """generate_embedding for search queries: memory tier only, no Postgres round trip."""
+    name, revision = model_identity("embedder")
+    return cache.get_or_compute(EMBEDDING_KIND, name, revision, [text or ""], _encode, use_db=False)[0].tolist()
 
-def _cluster_texts_incremental(embeddings: np.ndarray, threshold: float = 0.65):
+def normalize_rows(vectors) -> np.ndarray:
+    """L2-normalize each row (float32); zero rows stay zero"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def assign_to_centroid(vec, centroids: np.ndarray, threshold: float = DEFAULT_THRESHOLD) -> Optional[int]:
+    """
+    Return the row index of the centroid most similar to `vec`, or None when
+    no centroid reaches `threshold` (caller should open a new cluster).
+    """
+    if centroids is None or len(centroids) == 0:
+        return None
+    sims = normalize_rows(centroids) @ normalize_rows(vec)[0]
+    best_idx = int(np.argmax(sims))
+    if float(sims[best_idx]) >= threshold:
+        return best_idx
+    return None
+
+def centroid_add(centroid, count: int, vec) -> np.ndarray:
+    """Running mean after adding `vec` to a cluster of `count` members"""
+    centroid = np.asarray(centroid, dtype=np.float32)
+    return centroid + (np.asarray(vec, dtype=np.float32) - centroid) / (count + 1)
+
+def centroid_remove(centroid, count: int, vec) -> Optional[np.ndarray]:
+    """Running mean after removing `vec` from a cluster of `count` members (None if it becomes empty)"""
+    if count <= 1:
+        return None
+    centroid = np.asarray(centroid, dtype=np.float32)
+    return (centroid * count - np.asarray(vec, dtype=np.float32)) / (count - 1)
+
+class _CentroidBuffer:
+    """
+    Preallocated (capacity, d) centroid storage that doubles when full, so
+    adding a cluster never restacks the existing centroids. Keeps the running
+    means and a unit-length copy used for similarity (one mat-vec per query).
+    """
+
+    def __init__(self, dim: int, capacity: int = 16):
+        self.means = np.zeros((capacity, dim), dtype=np.float32)
+        self.units = np.zeros((capacity, dim), dtype=np.float32)
+        self.counts = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+
+    def _grow(self):
+        capacity = self.means.shape[0] * 2
+        for name in ("means", "units", "counts"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def _refresh_unit(self, idx: int):
+        norm = np.linalg.norm(self.means[idx])
+        self.units[idx] = self.means[idx] / norm if norm else 0.0
+
+    def similarities(self, unit_vec: np.ndarray) -> np.ndarray:
+        return self.units[:self.size] @ unit_vec
+
+    def open(self, vec: np.ndarray) -> int:
+        if self.size == self.means.shape[0]:
+            self._grow()
+        idx = self.size
+        self.means[idx] = vec
+        self.counts[idx] = 1
+        self._refresh_unit(idx)
+        self.size += 1
+        return idx
+
+    def add(self, idx: int, vec: np.ndarray):
+        self.counts[idx] += 1
+        self.means[idx] += (vec - self.means[idx]) / self.counts[idx]
+        self._refresh_unit(idx)
+
+def _cluster_texts_incremental(embeddings: np.ndarray, threshold: float = DEFAULT_THRESHOLD):
     """
     Incremental clustering on embedding vectors (numpy array of shape (n, d)).
+    Each vector joins the most similar centroid if cosine >= threshold, else
+    opens a new cluster; centroids are running means of their members.
     Returns list of clusters with indices into embeddings.
     """
     if embeddings.size == 0:
         return []
 
-    clusters = []  # each: {'centroid': np.array, 'indices': [i,...]}
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    units = normalize_rows(embeddings)  # normalized once, not per comparison
+    buf = _CentroidBuffer(embeddings.shape[1])
+    labels = np.empty(len(embeddings), dtype=np.int64)
 
-    for i, emb in enumerate(embeddings):
-        if not clusters:
-            clusters.append({'centroid': emb.copy(), 'indices': [i]})
-            continue
+    for i in range(len(embeddings)):
+        if buf.size:
+            sims = buf.similarities(units[i])
+            best_idx = int(np.argmax(sims))
+            if sims[best_idx] >= threshold:
+                buf.add(best_idx, embeddings[i])
+                labels[i] = best_idx
+                continue
+        labels[i] = buf.open(embeddings[i])
 
-        cents = np.stack([c['centroid'] for c in clusters])
-        sims = cosine_similarity([emb], cents)[0]  # shape (n_clusters,)
-        best_idx = int(np.argmax(sims))
-        best_sim = float(sims[best_idx])
+    # convert to list with cluster ids starting at 1
+    result = []
+    for cid in range(buf.size):
+        result.append({
+            'cluster_id': cid + 1,
+            'indices': np.flatnonzero(labels == cid).tolist(),
+            'centroid': buf.means[cid].copy(),
+        })
+    return result
 
-        if best_sim >= threshold:
-            clusters[best_idx]['indices'].append(i)
-            # update centroid as mean
-            clusters[best_idx]['centroid'] = np.mean(
-                np.vstack([clusters[best_idx]['centroid'], emb]), axis=0
-            )
-        else:
-            clusters.append({'centroid': emb.copy(), 'indices': [i]})
+def _cluster_agglomerative(embeddings: np.ndarray, threshold: float = DEFAULT_THRESHOLD):
+    """
+    Batch mode: average-linkage agglomerative clustering on cosine distance,
+    cut at 1 - threshold. Order-independent, but O(n^2) memory, so meant for
+    offline re-clustering rather than the request path.
+    """
+    if embeddings.size == 0:
+        return []
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if len(embeddings) == 1:
+        labels = np.zeros(1, dtype=np.int64)
+    else:
+        from sklearn.cluster import AgglomerativeClustering
+        model = AgglomerativeClustering(
+            n_clusters=None,
+            metric="cosine",
+            linkage="average",
+            distance_threshold=1.0 - threshold,
+        )
+        labels = model.fit_predict(normalize_rows(embeddings))
 
-    # convert to list with cluster ids starting at 1
+    # number clusters by first appearance so ids are stable for a given input order
+    _, first_seen = np.unique(labels, return_index=True)
     result = []
-    for cid, c in enumerate(clusters, start=1):
-        result.append({'cluster_id': cid, 'indices': c['indices'], 'centroid': c['centroid']})
+    for cid, label in enumerate(labels[np.sort(first_seen)], start=1):
+        idxs = np.flatnonzero(labels == label)
+        result.append({
+            'cluster_id': cid,
+            'indices': idxs.tolist(),
+            'centroid': embeddings[idxs].mean(axis=0),
+        })
     return result
 
+def cluster_indices(embeddings: np.ndarray, threshold: float = DEFAULT_THRESHOLD, method: str = "incremental"):
+    """
+    Cluster raw embeddings without any text: returns
+      [{'cluster_id': 1, 'indices': [...], 'centroid': np.ndarray}, ...]
+    """
+    if method == "incremental":
+        return _cluster_texts_incremental(embeddings, threshold=threshold)
+    if method == "agglomerative":
+        return _cluster_agglomerative(embeddings, threshold=threshold)
+    raise ValueError(f"Unknown clustering method {method!r}; expected one of {CLUSTER_METHODS}")
+
 def pick_representative(indices: List[int], texts: List[str], embeddings: np.ndarray):
     """
     Choose representative text for a cluster: the text whose embedding is most
@@ -60,17 +219,31 @@ def pick_representative(indices: List[int], texts: List[str], embeddings: np.nda
     """
     if not indices:
         return None
-    cluster_vecs = embeddings[indices]
-    centroid = np.mean(cluster_vecs, axis=0, keepdims=True)
-    sims = cosine_similarity(cluster_vecs, centroid)[0]
+    cluster_vecs = np.asarray(embeddings[indices], dtype=np.float32)
+    centroid = normalize_rows(cluster_vecs.mean(axis=0))[0]
+    sims = normalize_rows(cluster_vecs) @ centroid
     best_local = int(np.argmax(sims))
     best_index = indices[best_local]
     return texts[best_index]
 
-def cluster_texts(texts: List[str], insight_ids: Optional[List[int]] = None, threshold: float = 0.65):
+def summarize_members(members: np.ndarray):
+    """
+    (centroid, index of the member closest to it, that member's cosine score)
+    for the stored state of one cluster.
+    """
+    members = np.asarray(members, dtype=np.float32)
+    centroid = members.mean(axis=0)
+    norms = np.linalg.norm(members, axis=1) * (np.linalg.norm(centroid) or 1.0)
+    scores = members @ centroid / np.where(norms == 0, 1.0, norms)
+    best = int(np.argmax(scores))
+    return centroid, best, float(scores[best])
+
+def cluster_texts(texts: List[str], insight_ids: Optional[List[int]] = None, threshold: float = DEFAULT_THRESHOLD,
+                  method: str = "incremental"):
     """
     texts: list[str] summaries
     insight_ids: optional list[int] parallel to texts. If not provided, indexes used as ids.
+    method: "incremental" (default, single pass) or "agglomerative" (batch)
     returns list of clusters:
       [{'cluster_id': 1, 'insight_ids':[id1,id2], 'representative': '...'}, ...]
     """
@@ -78,10 +251,16 @@ def cluster_texts(texts: List[str], insight_ids: Optional[List[int]] = None, thr
         return []
 
     # compute embeddings (numpy array)
-    embeddings = embedder.encode(texts, show_progress_bar=False)
-    embeddings = np.asarray(embeddings)
+    embeddings = embed_texts(texts)
+    return cluster_embeddings(embeddings, texts, insight_ids=insight_ids, threshold=threshold, method=method)
 
-    raw_clusters = _cluster_texts_incremental(embeddings, threshold=threshold)
+def cluster_embeddings(embeddings: np.ndarray, texts: List[str], insight_ids: Optional[List[int]] = None,
+                       threshold: float = DEFAULT_THRESHOLD, method: str = "incremental"):
+    """
+    Same as cluster_texts but for embeddings that were already computed, so
+    callers that also persist the vectors only encode each text once.
+    """
+    raw_clusters = cluster_indices(embeddings, threshold=threshold, method=method)
 
     # default insight_ids to indices if not provided
     if insight_ids is None:
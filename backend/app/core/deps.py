@@ -1,29 +1,35 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from sqlalchemy import select
 from app.core.security import SECRET_KEY, ALGORITHM
-from app.db import SessionLocal
-from sqlalchemy.orm import Session
+from app.core.token_cache import AuthenticatedUser, token_cache
+from app.db import get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    # a token verified in the last AUTH_CACHE_TTL_SECONDS needs neither a decode nor a query
+    # (the session only checks out a connection when it is first used)
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
+        user_id = payload.get("uid")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
+    # tokens issued before the uid claim existed are still looked up by email
+    where = User.id == int(user_id) if user_id is not None else User.email == email
+    row = (await db.execute(select(User.id, User.email).where(where))).first()
+    if not row or row.email != email:
         raise HTTPException(status_code=401, detail="User not found")
 
+    user = AuthenticatedUser(id=row.id, email=row.email)
+    token_cache.put(token, user, token_exp=payload.get("exp"))
     return user
@@ -0,0 +1,48 @@
+# app/core/embedding_codec.py
+"""
+Compact binary encoding for embedding vectors (stored in a bytea column).
+
+Layout (little endian), 4-byte tag first so both variants can share a column:
+  float32: b"F32\\0" | float32 * d                 -> 4 + 4d bytes
+  int8:    b"I8\\0\\0" | float32 scale | int8 * d    -> 8 + d bytes
+
+float32 blobs decode zero-copy with np.frombuffer (the result is a read-only
+view on the fetched bytes). int8 blobs are symmetric per-vector scalar
+quantization: v ~= q * scale with scale = max|v| / 127.
+"""
+import numpy as np
+
+FLOAT32_TAG = b"F32\x00"
+INT8_TAG = b"I8\x00\x00"
+_F32 = np.dtype("<f4")
+
+
+def encode_float32(vec) -> bytes:
+    return FLOAT32_TAG + np.asarray(vec, dtype=_F32).tobytes()
+
+
+def encode_int8(vec) -> bytes:
+    vec = np.asarray(vec, dtype=np.float32)
+    peak = float(np.max(np.abs(vec))) if vec.size else 0.0
+    scale = peak / 127.0 if peak else 1.0
+    quantized = np.clip(np.rint(vec / scale), -127, 127).astype(np.int8)
+    return INT8_TAG + np.float32(scale).astype(_F32).tobytes() + quantized.tobytes()
+
+
+def encode(vec, fmt: str = "float32") -> bytes:
+    if fmt == "float32":
+        return encode_float32(vec)
+    if fmt == "int8":
+        return encode_int8(vec)
+    raise ValueError(f"Unknown embedding format {fmt!r}; expected 'float32' or 'int8'")
+
+
+def decode(blob) -> np.ndarray:
+    """Return the float32 vector stored in `blob` (bytes or memoryview)."""
+    tag = bytes(blob[:4])
+    if tag == FLOAT32_TAG:
+        return np.frombuffer(blob, dtype=_F32, offset=4)
+    if tag == INT8_TAG:
+        scale = np.frombuffer(blob, dtype=_F32, count=1, offset=4)[0]
+        return np.frombuffer(blob, dtype=np.int8, offset=8).astype(np.float32) * scale
+    raise ValueError(f"Unrecognised embedding blob tag {tag!r}")
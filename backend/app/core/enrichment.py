@@ -0,0 +1,199 @@
+# app/core/enrichment.py
+"""
+Deferred NLP enrichment.
+
+create_insight only stores the raw note plus a pending EnrichmentJob row and
+returns. Jobs are executed by an in-process thread pool: summary, keywords
+and sentiment are filled in (via the micro-batched analyze_text), then the
+insight is embedded and assigned to a cluster.
+
+Edits re-use the same path: PATCH /insights/{id} re-enqueues the job only
+when the content hash changed.
+
+The job table is the source of truth, so work survives restarts:
+`resume_pending` re-schedules pending jobs and jobs left 'running' by a dead
+process. A job is claimed with SELECT ... FOR UPDATE SKIP LOCKED under a
+fresh claim token, and a run only finishes (or fails) the job while it still
+holds that token: a re-enqueue during the run, and the claim that follows
+it, make the old run's result a no-op. This keeps duplicate scheduling and
+concurrent re-enqueues harmless. Failures are retried with exponential
+backoff up to ENRICHMENT_MAX_ATTEMPTS.
+"""
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import exists
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models.insight import Insight
+from app.models.embedding import InsightEmbedding
+from app.models.enrichment import EnrichmentJob
+from app.core.nlp import analyze_text
+from app.core.cluster_service import assign_insight
+
+logger = logging.getLogger(__name__)
+
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", "2"))
+ENRICHMENT_MAX_ATTEMPTS = int(os.getenv("ENRICHMENT_MAX_ATTEMPTS", "3"))
+ENRICHMENT_RETRY_DELAY = float(os.getenv("ENRICHMENT_RETRY_DELAY", "5"))  # seconds, doubled per attempt
+ENRICHMENT_STALE_AFTER = timedelta(minutes=int(os.getenv("ENRICHMENT_STALE_MINUTES", "10")))
+
+_executor = ThreadPoolExecutor(max_workers=ENRICHMENT_WORKERS, thread_name_prefix="enrich")
+
+
+def enqueue(db: Session, insight: Insight) -> EnrichmentJob:
+    """
+    Create (or reset) the job for `insight` in the caller's transaction. Call
+    `schedule(insight.id)` after committing.
+    """
+    insight.enrichment_status = "pending"
+    job = db.query(EnrichmentJob).filter(EnrichmentJob.insight_id == insight.id).first()
+    if job is None:
+        job = EnrichmentJob(insight_id=insight.id, status="pending", attempts=0)
+        db.add(job)
+    else:
+        job.status = "pending"
+        job.attempts = 0
+        job.last_error = None
+        job.claim_token = None
+    return job
+
+
+def schedule(insight_id: int, delay: float = 0.0):
+    if delay > 0:
+        timer = threading.Timer(delay, schedule, args=(insight_id,))
+        timer.daemon = True
+        timer.start()
+        return
+    _executor.submit(run_job, insight_id)
+
+
+def _claim(db: Session, insight_id: int):
+    job = (
+        db.query(EnrichmentJob)
+        .filter(EnrichmentJob.insight_id == insight_id, EnrichmentJob.status == "pending")
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        return None
+    job.status = "running"
+    job.attempts += 1
+    job.claim_token = uuid.uuid4().hex
+    db.commit()
+    return job
+
+
+def enrich_insight(db: Session, insight: Insight):
+    """
+    Fill the NLP fields of `insight`, then embed it and move it to its
+    cluster. Stage outputs come from the NLP cache when the text was seen
+    before, and the embedding/cluster step is skipped when the summary it is
+    computed from did not change. If the content was edited while the models
+    ran, nothing is written: the edit re-enqueued the job, and that run wins.
+    """
+    content_hash = insight.content_hash
+    analysis = analyze_text(insight.content)
+
+    db.refresh(insight, with_for_update=True)
+    if insight.content_hash != content_hash:
+        db.rollback()
+        return
+
+    summary = analysis.get("summary")
+    summary_changed = summary != insight.summary
+    insight.summary = summary
+    insight.keywords = ",".join(analysis.get("keywords", []))
+    insight.sentiment = analysis.get("sentiment")
+    db.commit()
+
+    embedded = db.query(
+        exists().where(InsightEmbedding.insight_id == insight.id)
+    ).scalar()
+    if summary_changed or not embedded:
+        assign_insight(db, insight)
+
+
+def run_job(insight_id: int):
+    """Worker entry point; safe to call more than once for the same insight."""
+    db = SessionLocal()
+    try:
+        job = _claim(db, insight_id)
+        if job is None:
+            return  # already done, running elsewhere, or insight deleted
+        job_id, attempts, token = job.id, job.attempts, job.claim_token
+
+        try:
+            insight = db.query(Insight).filter(Insight.id == insight_id).first()
+            if insight is None:
+                return
+            enrich_insight(db, insight)
+        except Exception as exc:
+            db.rollback()
+            logger.exception("Enrichment of insight %s failed (attempt %s)", insight_id, attempts)
+            _record_failure(db, job_id, token, insight_id, attempts, exc)
+            return
+
+        # only finish if the job was not re-enqueued (and possibly re-claimed) meanwhile
+        finished = (
+            db.query(EnrichmentJob)
+            .filter(EnrichmentJob.id == job_id, EnrichmentJob.claim_token == token)
+            .update({"status": "done", "last_error": None, "claim_token": None}, synchronize_session=False)
+        )
+        if finished:
+            db.query(Insight).filter(Insight.id == insight_id).update(
+                {"enrichment_status": "done"}, synchronize_session=False
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _record_failure(db: Session, job_id: int, token: str, insight_id: int, attempts: int, exc: Exception):
+    give_up = attempts >= ENRICHMENT_MAX_ATTEMPTS
+    recorded = db.query(EnrichmentJob).filter(EnrichmentJob.id == job_id, EnrichmentJob.claim_token == token).update(
+        {"status": "failed" if give_up else "pending", "last_error": repr(exc)[:2000], "claim_token": None},
+        synchronize_session=False,
+    )
+    if not recorded:
+        db.commit()
+        return  # re-enqueued meanwhile; the newer run owns the job
+    if give_up:
+        db.query(Insight).filter(Insight.id == insight_id).update(
+            {"enrichment_status": "failed"}, synchronize_session=False
+        )
+    db.commit()
+    if not give_up:
+        schedule(insight_id, delay=ENRICHMENT_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def resume_pending():
+    """Re-schedule durable jobs on startup (pending, or 'running' but stale)."""
+    db = SessionLocal()
+    try:
+        stale_before = datetime.now(timezone.utc) - ENRICHMENT_STALE_AFTER
+        db.query(EnrichmentJob).filter(
+            EnrichmentJob.status == "running", EnrichmentJob.updated_at < stale_before
+        ).update({"status": "pending"}, synchronize_session=False)
+        db.commit()
+        pending = [row.insight_id for row in db.query(EnrichmentJob.insight_id).filter(EnrichmentJob.status == "pending")]
+    finally:
+        db.close()
+    for insight_id in pending:
+        schedule(insight_id)
+    return len(pending)
+
+
+def job_status(db: Session, insight: Insight) -> dict:
+    job = db.query(EnrichmentJob).filter(EnrichmentJob.insight_id == insight.id).first()
+    return {
+        "insight_id": insight.id,
+        "enrichment_status": insight.enrichment_status,
+        "attempts": job.attempts if job else 0,
+        "last_error": job.last_error if job else None,
+    }
@@ -0,0 +1,147 @@
+# app/core/export.py
+"""
+Streaming export of a user's insights with their cluster id and vector.
+
+Rows are read through a server-side cursor (`yield_per`), so at most
+EXPORT_BATCH_SIZE rows are in memory however large the history is, and are
+encoded batch by batch:
+
+  - "ndjson":  one JSON object per line
+  - "arrow":   Arrow IPC stream, one record batch per DB batch
+  - "parquet": Parquet file, one row group per DB batch
+
+Arrow and Parquet need the optional `pyarrow` package.
+"""
+import json
+import os
+from typing import Iterator, List
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.insight import Insight
+from app.models.embedding import InsightEmbedding
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = None
+
+EXPORT_FORMATS = ("ndjson", "arrow", "parquet")
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+
+def format_available(fmt: str) -> bool:
+    return fmt == "ndjson" or pa is not None
+
+
+def iter_batches(db: Session, user_id: int, include_vectors: bool = True,
+                 batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[dict]]:
+    cols = [
+        Insight.id, Insight.title, Insight.content, Insight.tags, Insight.summary,
+        Insight.keywords, Insight.sentiment, Insight.created_at, InsightEmbedding.cluster_id,
+    ]
+    if include_vectors:
+        cols.append(InsightEmbedding.vector)
+    stmt = (
+        select(*cols)
+        .outerjoin(InsightEmbedding, InsightEmbedding.insight_id == Insight.id)
+        .where(Insight.user_id == user_id)
+        .order_by(Insight.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for partition in db.execute(stmt).partitions():
+        batch = []
+        for row in partition:
+            item = row._asdict()
+            item["keywords"] = item["keywords"].split(",") if item["keywords"] else []
+            item["created_at"] = item["created_at"].isoformat() if item["created_at"] else None
+            if include_vectors and item["vector"] is not None:
+                item["vector"] = np.asarray(item["vector"], dtype=np.float32).tolist()
+            batch.append(item)
+        yield batch
+
+
+def ndjson_chunks(batches: Iterator[List[dict]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(json.dumps(item) + "\n" for item in batch).encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to a generator."""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks: List[bytes] = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # absolute position: Parquet footers reference row-group offsets
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def _schema(include_vectors: bool):
+    fields = [
+        ("id", pa.int64()), ("title", pa.string()), ("content", pa.string()), ("tags", pa.string()),
+        ("summary", pa.string()), ("keywords", pa.list_(pa.string())), ("sentiment", pa.string()),
+        ("created_at", pa.string()), ("cluster_id", pa.int64()),
+    ]
+    if include_vectors:
+        fields.append(("vector", pa.list_(pa.float32())))
+    return pa.schema(fields)
+
+
+def arrow_chunks(batches: Iterator[List[dict]], fmt: str, include_vectors: bool = True) -> Iterator[bytes]:
+    schema = _schema(include_vectors)
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+        write = writer.write_table
+        to_arrow = pa.Table.from_pylist
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+        to_arrow = pa.RecordBatch.from_pylist
+    try:
+        for batch in batches:
+            write(to_arrow(batch, schema=schema))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_chunks(db: Session, user_id: int, fmt: str = "ndjson", include_vectors: bool = True,
+                  batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    batches = iter_batches(db, user_id, include_vectors=include_vectors, batch_size=batch_size)
+    if fmt == "ndjson":
+        return ndjson_chunks(batches)
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {EXPORT_FORMATS}")
+    return arrow_chunks(batches, fmt, include_vectors=include_vectors)
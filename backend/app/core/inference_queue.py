@@ -0,0 +1,109 @@
+# app/core/inference_queue.py
+"""
+Micro-batching front end for model inference.
+
+Callers from many request threads `submit()` single items and get a Future
+back. A worker thread waits for the first item, keeps collecting until either
+`max_batch_size` items are queued or `max_wait_ms` has passed, then runs the
+batch function once and resolves every caller's future with its own result.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+
+class MicroBatcher:
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 8,
+                 max_wait_ms: float = 10.0, name: str = "batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "batches": 0,
+            "items": 0,
+            "errors": 0,
+            "queue_time_total": 0.0,
+            "queue_time_max": 0.0,
+            "batch_time_total": 0.0,
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, item) -> Future:
+        self._ensure_started()
+        fut: Future = Future()
+        self._queue.put((item, fut, time.perf_counter()))
+        return fut
+
+    def __call__(self, item, timeout: float = None):
+        """Submit `item` and block until its result is ready."""
+        return self.submit(item).result(timeout=timeout)
+
+    def _collect(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            waits = [started - enqueued for _, _, enqueued in batch]
+            try:
+                results = self.batch_fn([item for item, _, _ in batch])
+                for (_, fut, _), result in zip(batch, results):
+                    fut.set_result(result)
+                failed = False
+            except Exception as exc:
+                for _, fut, _ in batch:
+                    fut.set_exception(exc)
+                failed = True
+
+            with self._stats_lock:
+                s = self._stats
+                s["batches"] += 1
+                s["items"] += len(batch)
+                s["errors"] += int(failed)
+                s["queue_time_total"] += sum(waits)
+                s["queue_time_max"] = max(s["queue_time_max"], max(waits))
+                s["batch_time_total"] += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            s = dict(self._stats)
+        batches = s["batches"] or 1
+        items = s["items"] or 1
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queued": self._queue.qsize(),
+            "batches": s["batches"],
+            "items": s["items"],
+            "errors": s["errors"],
+            "avg_batch_size": s["items"] / batches,
+            "avg_batch_fill": s["items"] / batches / self.max_batch_size,
+            "avg_queue_ms": s["queue_time_total"] / items * 1000.0,
+            "max_queue_ms": s["queue_time_max"] * 1000.0,
+            "avg_batch_ms": s["batch_time_total"] / batches * 1000.0,
+        }
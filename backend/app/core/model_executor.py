@@ -0,0 +1,26 @@
+# app/core/model_executor.py
+"""
+Dedicated thread pool for model inference called from async handlers.
+
+Running a model call directly in an `async def` handler would stall the
+event loop, and handing it to Starlette's shared threadpool would let slow
+inference starve the sync work that pool also serves. Model calls go through
+`run_model` instead: MODEL_EXECUTOR_WORKERS threads (default 4) that only
+ever run model code. Micro-batching (app.core.inference_queue) still applies,
+since the worker threads block on the batcher's futures like request threads
+used to.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+MODEL_EXECUTOR_WORKERS = int(os.getenv("MODEL_EXECUTOR_WORKERS", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=MODEL_EXECUTOR_WORKERS, thread_name_prefix="model")
+
+
+async def run_model(fn, *args, **kwargs):
+    """Await `fn(*args, **kwargs)` executed on the model executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
@@ -0,0 +1,265 @@
+# app/core/model_registry.py
+"""
+Shared, lazily loaded model registry.
+
+Nothing heavy is imported or loaded at module import time: each model is
+built on its first `get()` (or by `warm_up()` at startup when WARMUP_MODELS
+is set), exactly once per process even under concurrent first use. KeyBERT is
+built on top of the shared MiniLM SentenceTransformer, so one copy of that
+model serves keyword extraction, clustering and search.
+
+`stats()` reports per-model load time and the resident memory it added
+(process RSS delta; GPU allocation delta when on CUDA).
+
+INFERENCE_BACKEND=onnx serves the summarizer, sentiment classifier and
+embedder from int8-quantized ONNX exports (see app/export_onnx.py) through
+ONNX Runtime, with ONNX_INTRA_OP_THREADS / ONNX_INTER_OP_THREADS; meant for
+CPU-only deployments. The backend is part of each model's cache identity,
+so PyTorch and ONNX outputs are never mixed in the NLP cache.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+SUMMARIZER_MODEL = "facebook/bart-large-cnn"
+SENTIMENT_MODEL = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# pinned hub revisions; also part of the NLP cache key, so bumping one invalidates its cached outputs
+MODEL_REVISIONS = {
+    "summarizer": os.getenv("SUMMARIZER_REVISION", "main"),
+    "sentiment": os.getenv("SENTIMENT_REVISION", "main"),
+    "embedder": os.getenv("EMBEDDER_REVISION", "main"),
+}
+MODEL_NAMES = {
+    "summarizer": SUMMARIZER_MODEL,
+    "sentiment": SENTIMENT_MODEL,
+    "embedder": EMBED_MODEL_NAME,
+    "keybert": EMBED_MODEL_NAME,
+}
+
+# "" (default, fully lazy), "all", or a comma-separated list of model names
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "")
+
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")  # torch | onnx
+INFERENCE_BACKENDS = ("torch", "onnx")
+ONNX_MODEL_DIR = os.getenv(
+    "ONNX_MODEL_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "onnx_models")
+)
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0 = onnxruntime default
+ONNX_INTER_OP_THREADS = int(os.getenv("ONNX_INTER_OP_THREADS", "0"))
+ONNX_MANIFEST = "manifest.json"
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def _gpu_bytes() -> Optional[int]:
+    try:
+        import torch
+    except ImportError:  # onnx-only deployments
+        return None
+    if not torch.cuda.is_available():
+        return None
+    return torch.cuda.memory_allocated()
+
+
+def torch_device() -> str:
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], object]] = {}
+        self._models: Dict[str, object] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._stats: Dict[str, dict] = {}
+
+    def register(self, name: str, loader: Callable[[], object]):
+        self._loaders[name] = loader
+        self._locks[name] = threading.Lock()
+
+    def names(self):
+        return list(self._loaders)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def get(self, name: str):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._locks[name]:
+            if name not in self._models:
+                self._models[name] = self._load(name)
+        return self._models[name]
+
+    def _load(self, name: str):
+        rss_before, gpu_before = _rss_bytes(), _gpu_bytes()
+        started = time.perf_counter()
+        model = self._loaders[name]()
+        elapsed = time.perf_counter() - started
+        rss_after, gpu_after = _rss_bytes(), _gpu_bytes()
+
+        self._stats[name] = {
+            "load_seconds": round(elapsed, 3),
+            "rss_delta_mb": round((rss_after - rss_before) / 1e6, 1) if rss_before is not None else None,
+            "gpu_delta_mb": round((gpu_after - gpu_before) / 1e6, 1) if gpu_before is not None else None,
+        }
+        logger.info("Loaded model %s in %.2fs", name, elapsed)
+        return model
+
+    def warm_up(self, names: Optional[Iterable[str]] = None):
+        for name in (names or self.names()):
+            try:
+                self.get(name)
+            except Exception:  # one broken model must not keep the others cold
+                logger.exception("Warm-up of model %s failed", name)
+
+    def warm_up_in_background(self, spec: str = WARMUP_MODELS):
+        """
+        Start loading the models named in `spec` without blocking startup.
+        Unknown names are logged and skipped here, on the caller's thread.
+        """
+        if not spec:
+            return None
+        names = None
+        if spec != "all":
+            requested = [n.strip() for n in spec.split(",") if n.strip()]
+            unknown = [n for n in requested if n not in self._loaders]
+            if unknown:
+                logger.warning("Ignoring unknown WARMUP_MODELS entries %s; known models: %s",
+                               ", ".join(unknown), ", ".join(self.names()))
+            names = [n for n in requested if n in self._loaders]
+            if not names:
+                return None
+        thread = threading.Thread(target=self.warm_up, args=(names,), name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> dict:
+        return {
+            name: {"loaded": self.is_loaded(name), **self._stats.get(name, {})}
+            for name in self.names()
+        }
+
+
+def model_identity(name: str):
+    """(model name, revision) for a registry entry; keybert shares the embedder's"""
+    base = "embedder" if name == "keybert" else name
+    revision = MODEL_REVISIONS[base]
+    if INFERENCE_BACKEND == "onnx":
+        revision = f"{revision}+onnx-int8"
+    return MODEL_NAMES[name], revision
+
+
+def _backend(backend: Optional[str]) -> str:
+    backend = backend or INFERENCE_BACKEND
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown INFERENCE_BACKEND {backend!r}; expected one of {INFERENCE_BACKENDS}")
+    return backend
+
+
+def onnx_manifest(model_dir: str = ONNX_MODEL_DIR) -> dict:
+    """Written by app/export_onnx.py: per model, its export directory and ONNX file names."""
+    path = os.path.join(model_dir, ONNX_MANIFEST)
+    if not os.path.exists(path):
+        raise RuntimeError(f"No ONNX export at {model_dir}; run app/export_onnx.py first")
+    with open(path) as f:
+        return json.load(f)
+
+
+def onnx_session_options():
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    if ONNX_INTRA_OP_THREADS:
+        options.intra_op_num_threads = ONNX_INTRA_OP_THREADS
+    if ONNX_INTER_OP_THREADS:
+        options.inter_op_num_threads = ONNX_INTER_OP_THREADS
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return options
+
+
+def load_embedder(backend: Optional[str] = None):
+    from sentence_transformers import SentenceTransformer
+    if _backend(backend) == "onnx":
+        entry = onnx_manifest()["embedder"]
+        return SentenceTransformer(
+            os.path.join(ONNX_MODEL_DIR, entry["path"]), backend="onnx", device="cpu",
+            model_kwargs={"file_name": entry["file_name"], "provider": "CPUExecutionProvider",
+                          "session_options": onnx_session_options()},
+        )
+    return SentenceTransformer(EMBED_MODEL_NAME, device=torch_device(), revision=MODEL_REVISIONS["embedder"])
+
+
+def _pipeline_device() -> int:
+    return 0 if torch_device() == "cuda" else -1
+
+
+def _onnx_pipeline(task: str, name: str):
+    from transformers import AutoTokenizer, pipeline
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTModelForSequenceClassification
+
+    entry = onnx_manifest()[name]
+    path = os.path.join(ONNX_MODEL_DIR, entry["path"])
+    model_cls = ORTModelForSeq2SeqLM if task == "summarization" else ORTModelForSequenceClassification
+    model = model_cls.from_pretrained(
+        path, provider="CPUExecutionProvider", session_options=onnx_session_options(), **entry["files"]
+    )
+    return pipeline(task, model=model, tokenizer=AutoTokenizer.from_pretrained(path))
+
+
+def load_summarizer(backend: Optional[str] = None):
+    if _backend(backend) == "onnx":
+        return _onnx_pipeline("summarization", "summarizer")
+    from transformers import pipeline
+    return pipeline("summarization", model=SUMMARIZER_MODEL, revision=MODEL_REVISIONS["summarizer"],
+                    device=_pipeline_device(), torch_dtype="auto")
+
+
+def load_sentiment(backend: Optional[str] = None):
+    if _backend(backend) == "onnx":
+        return _onnx_pipeline("sentiment-analysis", "sentiment")
+    from transformers import pipeline
+    return pipeline("sentiment-analysis", model=SENTIMENT_MODEL, revision=MODEL_REVISIONS["sentiment"],
+                    device=_pipeline_device(), torch_dtype="auto")
+
+
+def _load_keybert():
+    from keybert import KeyBERT
+    # reuse the shared MiniLM instance instead of letting KeyBERT load its own
+    return KeyBERT(model=registry.get("embedder"))
+
+
+registry = ModelRegistry()
+registry.register("embedder", load_embedder)
+registry.register("summarizer", load_summarizer)
+registry.register("sentiment", load_sentiment)
+registry.register("keybert", _load_keybert)
+
+
+def get_embedder():
+    return registry.get("embedder")
+
+
+def get_summarizer():
+    return registry.get("summarizer")
+
+
+def get_sentiment_analyzer():
+    return registry.get("sentiment")
+
+
+def get_keybert():
+    return registry.get("keybert")
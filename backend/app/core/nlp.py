@@ -1,32 +1,215 @@
-from transformers import pipeline
-from keybert import KeyBERT
+import os
+from collections import defaultdict
+from typing import List, Optional
 
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn", device=0, torch_dtype="auto")
-sentiment_analyzer = pipeline("sentiment-analysis", model="cardiffnlp/twitter-roberta-base-sentiment-latest", device=0, torch_dtype="auto")
-kw_model = KeyBERT()
+from app.core.clustering import embed_candidates, embed_texts
+from app.core.inference_queue import MicroBatcher
+from app.core.insight_extractor import split_sentences
+from app.core.model_registry import get_summarizer, get_sentiment_analyzer, get_keybert, model_identity
+from app.core.nlp_cache import cache
 
-def analyze_text(text: str):
-    #summarization
+# requests arriving within NLP_MAX_WAIT_MS of each other share one padded batch
+NLP_BATCHING = os.getenv("NLP_BATCHING", "1") != "0"
+NLP_MAX_BATCH_SIZE = int(os.getenv("NLP_MAX_BATCH_SIZE", "8"))
+NLP_MAX_WAIT_MS = float(os.getenv("NLP_MAX_WAIT_MS", "10"))
+
+# stage outputs are cached by (kind, model, revision, text hash); bump the kind's
+# version suffix whenever the generation parameters below change
+SUMMARY_KIND = "summary/v2"
+KEYWORDS_KIND = "keywords/v1"
+SENTIMENT_KIND = "sentiment/v1"
+
+# Long notes are summarized map-reduce style: split on sentence boundaries into
+# chunks of at most SUMMARY_CHUNK_TOKENS tokens, summarize every chunk of every
+# text in one batched pass, join each text's partial summaries and repeat until
+# a text fits in one chunk (at most SUMMARY_MAX_ROUNDS passes). The generation
+# budget follows the input: max_length is SUMMARY_RATIO of the input tokens,
+# rounded up to one of SUMMARY_LENGTH_BUCKETS (one pipeline call per bucket).
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "900"))
+SUMMARY_RATIO = float(os.getenv("SUMMARY_RATIO", "0.35"))
+SUMMARY_LENGTH_BUCKETS = (32, 64, 128, 256)
+SUMMARY_MAX_ROUNDS = int(os.getenv("SUMMARY_MAX_ROUNDS", "3"))
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "8"))
+
+# KeyBERT's defaults; the candidate vocabulary is built here so its embeddings
+# can come from the candidate cache
+KEYWORD_NGRAM_RANGE = (1, 1)
+KEYWORD_TOP_N = 5
+
+def _chunk_limit(summarizer) -> int:
+    # BART's window is 1024 positions including <s> and </s>
+    model_max = getattr(summarizer.model.config, "max_position_embeddings", 1024)
+    return min(SUMMARY_CHUNK_TOKENS, model_max - 2)
+
+def _target_length(n_tokens: int) -> int:
+    want = int(n_tokens * SUMMARY_RATIO)
+    for bucket in SUMMARY_LENGTH_BUCKETS:
+        if want <= bucket:
+            return bucket
+    return SUMMARY_LENGTH_BUCKETS[-1]
+
+def _token_counts(tokenizer, texts: List[str]) -> List[int]:
+    if not texts:
+        return []
+    return [len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]]
+
+def split_chunks(text: str, tokenizer, limit: int) -> List[str]:
+    """Greedily pack whole sentences into chunks of at most `limit` tokens."""
+    sentences = split_sentences(text) or [text]
+    chunks, current, current_len = [], [], 0
+    for sentence, n in zip(sentences, _token_counts(tokenizer, sentences)):
+        if n > limit:
+            # one over-long "sentence" (no punctuation): cut it on token windows
+            if current:
+                chunks.append(" ".join(current))
+                current, current_len = [], 0
+            ids = tokenizer(sentence, add_special_tokens=False)["input_ids"]
+            chunks.extend(tokenizer.decode(ids[i:i + limit]) for i in range(0, len(ids), limit))
+            continue
+        if current and current_len + n > limit:
+            chunks.append(" ".join(current))
+            current, current_len = [], 0
+        current.append(sentence)
+        current_len += n
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+def _generate(summarizer, texts: List[str], token_counts: List[int]) -> List[Optional[str]]:
+    """Summarize `texts` with one pipeline call per length bucket; None where it failed."""
+    out: List[Optional[str]] = [None] * len(texts)
+    buckets = defaultdict(list)
+    for i, n in enumerate(token_counts):
+        buckets[_target_length(n)].append(i)
+    for max_length, idxs in buckets.items():
+        batch = [texts[i] for i in idxs]
+        try:
+            res = summarizer(batch, max_length=max_length, min_length=min(15, max_length // 2),
+                             do_sample=False, truncation=True, batch_size=SUMMARY_BATCH_SIZE)
+            for i, r in zip(idxs, res):
+                out[i] = r['summary_text']
+        except Exception:
+            if len(batch) > 1:
+                # retry one by one so a single bad input doesn't fail the whole bucket
+                for i in idxs:
+                    out[i] = _generate(summarizer, [texts[i]], [token_counts[i]])[0]
+    return out
+
+def _summaries(texts: List[str]) -> List[Optional[str]]:
     try:
-        summary = summarizer(text, max_length=1000, min_length=15, do_sample=False)[0]['summary_text']
+        summarizer = get_summarizer()
     except Exception:
-        summary = "Summary unavailable."
-    
-    #keywords
+        return [None] * len(texts)
+    tokenizer = summarizer.tokenizer
+    limit = _chunk_limit(summarizer)
+
+    results: List[Optional[str]] = [None] * len(texts)
+    current = list(texts)
+    pending = list(range(len(texts)))
+    for round_no in range(SUMMARY_MAX_ROUNDS):
+        last_round = round_no == SUMMARY_MAX_ROUNDS - 1
+        # map: every chunk of every pending text in one batched pass (the last
+        # round gives each text a single, truncated chunk so it always finishes)
+        flat, owner = [], []
+        for i in pending:
+            chunks = [current[i]] if last_round else split_chunks(current[i], tokenizer, limit)
+            flat.extend(chunks)
+            owner.extend([i] * len(chunks))
+        partial = _generate(summarizer, flat, [min(n, limit) for n in _token_counts(tokenizer, flat)])
+
+        parts, failed = defaultdict(list), set()
+        for i, summary in zip(owner, partial):
+            if summary is None:
+                failed.add(i)
+            else:
+                parts[i].append(summary)
+
+        # reduce: single-chunk texts are done, the rest go round again on their joined partials
+        next_pending = []
+        for i in pending:
+            if i in failed:
+                continue
+            if len(parts[i]) == 1:
+                results[i] = parts[i][0]
+            else:
+                current[i] = " ".join(parts[i])
+                next_pending.append(i)
+        pending = next_pending
+        if not pending:
+            break
+    return results
+
+def _lead(text: str, max_chars: int = 300) -> str:
+    """Extractive fallback: the opening sentences of the note."""
+    lead = " ".join(split_sentences(text or "")[:2])[:max_chars]
+    return lead or "Summary unavailable."
+
+def _keywords(texts: List[str]) -> List[Optional[List[str]]]:
+    # KeyBERT gets its vectors from the shared embedding path instead of
+    # encoding on its own: the notes through embed_texts (so a note that is
+    # its own summary is encoded once), the candidate words through the
+    # candidate cache (only unseen words reach the model)
     try:
-        keywords = [kw[0] for kw in kw_model.extract_keywords(text, top_n=5)]
+        from sklearn.feature_extraction.text import CountVectorizer
+        try:
+            vectorizer = CountVectorizer(ngram_range=KEYWORD_NGRAM_RANGE, stop_words="english").fit(texts)
+        except ValueError:
+            return [[] for _ in texts]  # nothing but stop words
+        words = vectorizer.get_feature_names_out().tolist()
+        out = get_keybert().extract_keywords(
+            texts,
+            vectorizer=vectorizer,
+            top_n=KEYWORD_TOP_N,
+            doc_embeddings=embed_texts(texts),
+            word_embeddings=embed_candidates(words),
+        )
+        # KeyBERT returns a flat list for a single document
+        if len(texts) == 1:
+            out = [out]
+        return [[kw[0] for kw in doc] for doc in out]
     except Exception:
-        keywords = []
-    #sentiment
+        if len(texts) == 1:
+            return [None]
+        return [_keywords([t])[0] for t in texts]
+
+def _sentiments(texts: List[str]) -> List[Optional[str]]:
     try:
-        sentiment = sentiment_analyzer(text[:512])[0]['label']
+        out = get_sentiment_analyzer()([t[:512] for t in texts], truncation=True, batch_size=len(texts))
+        return [o['label'] for o in out]
     except Exception:
-        sentiment = "neutral"
-    
-    return {
-        "summary": summary,
-        "sentiment": sentiment,
-        "keywords": keywords
-    } 
+        if len(texts) == 1:
+            return [None]
+        return [_sentiments([t])[0] for t in texts]
+
+def _cached(kind: str, model: str, texts: List[str], compute):
+    name, revision = model_identity(model)
+    return cache.get_or_compute(kind, name, revision, texts, compute)
 
+def analyze_texts(texts: List[str]) -> List[dict]:
+    """
+    Run summarization, keywords and sentiment on a batch of texts (one
+    pipeline call each, for the texts not already cached)
+    """
+    if not texts:
+        return []
+    summaries = _cached(SUMMARY_KIND, "summarizer", texts, _summaries)
+    keywords = _cached(KEYWORDS_KIND, "keybert", texts, _keywords)
+    sentiments = _cached(SENTIMENT_KIND, "sentiment", texts, _sentiments)
+    # failures are never cached; they fall back to the note's lead / neutral / no keywords
+    return [
+        {
+            "summary": summary if summary is not None else _lead(text),
+            "sentiment": sentiment if sentiment is not None else "neutral",
+            "keywords": kws if kws is not None else [],
+        }
+        for text, summary, sentiment, kws in zip(texts, summaries, sentiments, keywords)
+    ]
 
+analyze_batcher = MicroBatcher(
+    analyze_texts, max_batch_size=NLP_MAX_BATCH_SIZE, max_wait_ms=NLP_MAX_WAIT_MS, name="nlp-analyze"
+)
+
+def analyze_text(text: str):
+    if NLP_BATCHING:
+        return analyze_batcher(text)
+    return analyze_texts([text])[0]
@@ -0,0 +1,228 @@
+# app/core/nlp_cache.py
+"""
+Content-addressed cache for model outputs.
+
+Entries are keyed by (kind, model name, model revision, sha256(text)), so a
+given text is only run through a given model once; changing the model or its
+revision (or bumping the kind's version suffix when generation parameters
+change) naturally misses.
+
+Two tiers:
+  - in-process LRU (NLP_CACHE_MAX_ENTRIES entries, NLP_CACHE_TTL_SECONDS TTL)
+  - Postgres `nlp_cache` table shared by all workers (NLP_CACHE_DB=0 to
+    disable), pruned by age and row count every NLP_CACHE_PRUNE_EVERY writes
+
+All lookups are batched: one SELECT per call for the texts missing from
+memory, one INSERT ... ON CONFLICT DO NOTHING for new results.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db import SessionLocal
+from app.models.nlp_cache import NlpCacheEntry
+from app.core import embedding_codec
+
+logger = logging.getLogger(__name__)
+
+NLP_CACHE_ENABLED = os.getenv("NLP_CACHE", "1") != "0"
+NLP_CACHE_DB = os.getenv("NLP_CACHE_DB", "1") != "0"
+NLP_CACHE_MAX_ENTRIES = int(os.getenv("NLP_CACHE_MAX_ENTRIES", "10000"))
+NLP_CACHE_TTL_SECONDS = int(os.getenv("NLP_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+NLP_CACHE_DB_MAX_ROWS = int(os.getenv("NLP_CACHE_DB_MAX_ROWS", "1000000"))
+NLP_CACHE_PRUNE_EVERY = int(os.getenv("NLP_CACHE_PRUNE_EVERY", "1000"))
+
+Key = Tuple[str, str, str, str]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+class NlpCache:
+    def __init__(self, max_entries: int = NLP_CACHE_MAX_ENTRIES, ttl: int = NLP_CACHE_TTL_SECONDS,
+                 use_db: bool = NLP_CACHE_DB):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.use_db = use_db
+        self._entries: "OrderedDict[Key, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    # ---- counters ----
+
+    def _count(self, kind: str, field: str, n: int = 1):
+        if n:
+            with self._lock:
+                c = self._counters.setdefault(kind, {"memory_hits": 0, "db_hits": 0, "misses": 0})
+                c[field] += n
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = {kind: dict(c) for kind, c in self._counters.items()}
+            size = len(self._entries)
+        for c in counters.values():
+            total = c["memory_hits"] + c["db_hits"] + c["misses"]
+            c["hit_rate"] = (c["memory_hits"] + c["db_hits"]) / total if total else 0.0
+        return {"memory_entries": size, "max_entries": self.max_entries, "kinds": counters}
+
+    # ---- memory tier ----
+
+    def _mem_get(self, key: Key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _mem_put(self, key: Key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear_memory(self):
+        with self._lock:
+            self._entries.clear()
+
+    # ---- DB tier ----
+
+    @staticmethod
+    def _encode(kind: str, value) -> dict:
+        if kind.startswith("embedding"):
+            return {"value": None, "vector": embedding_codec.encode_float32(value)}
+        return {"value": value, "vector": None}
+
+    @staticmethod
+    def _decode(kind: str, row):
+        if kind.startswith("embedding"):
+            return embedding_codec.decode(row.vector)
+        return row.value
+
+    def _db_get(self, kind: str, model: str, revision: str, hashes: List[str]) -> Dict[str, object]:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(NlpCacheEntry.text_hash, NlpCacheEntry.value, NlpCacheEntry.vector).where(
+                    NlpCacheEntry.kind == kind,
+                    NlpCacheEntry.model_name == model,
+                    NlpCacheEntry.model_revision == revision,
+                    NlpCacheEntry.text_hash.in_(hashes),
+                    NlpCacheEntry.created_at >= cutoff,
+                )
+            ).all()
+        finally:
+            db.close()
+        return {row.text_hash: self._decode(kind, row) for row in rows}
+
+    def _db_put(self, kind: str, model: str, revision: str, items: Dict[str, object]):
+        db = SessionLocal()
+        try:
+            stmt = insert(NlpCacheEntry).values([
+                {"kind": kind, "model_name": model, "model_revision": revision, "text_hash": h,
+                 **self._encode(kind, value)}
+                for h, value in items.items()
+            ]).on_conflict_do_nothing(constraint="uq_nlp_cache_key")
+            db.execute(stmt)
+            db.commit()
+        finally:
+            db.close()
+
+        with self._lock:
+            self._writes_since_prune += len(items)
+            due = self._writes_since_prune >= NLP_CACHE_PRUNE_EVERY
+            if due:
+                self._writes_since_prune = 0
+        if due:
+            self.prune()
+
+    def prune(self):
+        """Delete expired rows, then the oldest rows beyond NLP_CACHE_DB_MAX_ROWS."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+        db = SessionLocal()
+        try:
+            db.execute(delete(NlpCacheEntry).where(NlpCacheEntry.created_at < cutoff))
+            overflow = (
+                select(NlpCacheEntry.id)
+                .order_by(NlpCacheEntry.created_at.desc())
+                .offset(NLP_CACHE_DB_MAX_ROWS)
+                .scalar_subquery()
+            )
+            db.execute(delete(NlpCacheEntry).where(NlpCacheEntry.id.in_(overflow)))
+            db.commit()
+        finally:
+            db.close()
+
+    # ---- public API ----
+
+    def get_or_compute(self, kind: str, model: str, revision: str, texts: List[str],
+                       compute: Callable[[List[str]], List[object]],
+                       use_db: Optional[bool] = None) -> List[object]:
+        """
+        Return one value per text, calling `compute` once with only the texts
+        that are in neither tier (deduplicated), and caching what it returns.
+        `compute` may return None for an item it failed on; those are passed
+        through but never cached. `use_db=False` keeps this call to the memory
+        tier, for latency-sensitive one-off texts such as search queries.
+        """
+        if not NLP_CACHE_ENABLED or not texts:
+            return compute(texts)
+        use_db = self.use_db if use_db is None else use_db and self.use_db
+
+        hashes = [text_hash(t) for t in texts]
+        found: Dict[str, object] = {}
+        for h in set(hashes):
+            value = self._mem_get((kind, model, revision, h))
+            if value is not None:
+                found[h] = value
+        self._count(kind, "memory_hits", sum(1 for h in hashes if h in found))
+
+        missing = [h for h in dict.fromkeys(hashes) if h not in found]
+        if missing and use_db:
+            try:
+                from_db = self._db_get(kind, model, revision, missing)
+            except Exception:
+                logger.exception("NLP cache lookup failed; computing without the DB tier")
+                from_db = {}
+            for h, value in from_db.items():
+                self._mem_put((kind, model, revision, h), value)
+            found.update(from_db)
+            self._count(kind, "db_hits", sum(1 for h in hashes if h in from_db))
+            missing = [h for h in missing if h not in from_db]
+
+        if missing:
+            first_text = {}
+            for h, t in zip(hashes, texts):
+                first_text.setdefault(h, t)
+            computed = dict(zip(missing, compute([first_text[h] for h in missing])))
+            self._count(kind, "misses", sum(1 for h in hashes if h in computed))
+            found.update(computed)
+            computed = {h: value for h, value in computed.items() if value is not None}
+            for h, value in computed.items():
+                self._mem_put((kind, model, revision, h), value)
+            if computed and use_db:
+                try:
+                    self._db_put(kind, model, revision, computed)
+                except Exception:
+                    logger.exception("NLP cache write failed")
+
+        return [found[h] for h in hashes]
+
+
+cache = NlpCache()
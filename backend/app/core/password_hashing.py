@@ -0,0 +1,115 @@
+# app/core/password_hashing.py
+"""
+Bounded bcrypt pool.
+
+bcrypt costs ~250ms of CPU per call at the default work factor, so register
+and login must neither run it on the event loop nor queue it without limit.
+Hashes run on PASSWORD_HASH_WORKERS threads (the bcrypt extension releases
+the GIL while hashing, so threads use separate cores); at most
+PASSWORD_HASH_MAX_PENDING calls may be running or queued, beyond that
+`HashingOverloaded` is raised and the route answers 429 instead of letting
+the backlog (and every caller's latency) grow.
+
+BCRYPT_ROUNDS sets the work factor for new hashes. `verify_password` also
+reports whether a stored hash was made with a different factor, so login can
+transparently rehash it.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 4)))
+
+
+class HashingOverloaded(Exception):
+    """Raised when PASSWORD_HASH_MAX_PENDING hashes are already in flight."""
+
+
+def hash_password_sync(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+
+def check_password_sync(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def hash_rounds(hashed: str) -> int:
+    """Work factor of a modular-crypt bcrypt hash ($2b$<rounds>$...)."""
+    return int(hashed.split("$")[2])
+
+
+class HashingPool:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {"calls": 0, "rejected": 0, "busy_time_total": 0.0, "wait_time_total": 0.0}
+
+    def _timed(self, fn, submitted, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            done = time.perf_counter()
+            with self._lock:
+                self._stats["busy_time_total"] += done - started
+                self._stats["wait_time_total"] += started - submitted
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise HashingOverloaded()
+            self._pending += 1
+            self._stats["calls"] += 1
+        try:
+            future = self._executor.submit(self._timed, fn, time.perf_counter(), *args)
+        except BaseException:
+            self._release()
+            raise
+        # released when the hash itself ends (or is cancelled before it starts),
+        # not when the awaiting request goes away while it still runs
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            pending = self._pending
+        calls = s["calls"]
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": pending,
+            "calls": calls,
+            "rejected": s["rejected"],
+            "hash_ms_avg": round(s["busy_time_total"] / calls * 1000, 1) if calls else 0.0,
+            "queue_ms_avg": round(s["wait_time_total"] / calls * 1000, 1) if calls else 0.0,
+            "rounds": BCRYPT_ROUNDS,
+        }
+
+
+hashing_pool = HashingPool()
+
+
+async def hash_password(password: str) -> str:
+    return await hashing_pool.run(hash_password_sync, password)
+
+
+async def verify_password(password: str, hashed: str) -> Tuple[bool, bool]:
+    """(password matches, stored hash should be upgraded to BCRYPT_ROUNDS)"""
+    ok = await hashing_pool.run(check_password_sync, password, hashed)
+    return ok, ok and hash_rounds(hashed) != BCRYPT_ROUNDS
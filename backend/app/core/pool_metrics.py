@@ -0,0 +1,71 @@
+# app/core/pool_metrics.py
+"""
+Connection pools that time how long callers wait for a connection.
+
+QueuePool already knows its size, checked-out count and overflow; what it
+doesn't record is checkout latency, which is the number that shows a pool is
+too small. The subclasses below time `_do_get` (queue wait, plus connect
+time when an overflow connection is opened) and count timeouts. `pool_stats`
+reports both for the /metrics endpoint.
+"""
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class _TimedPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._timing_lock = threading.Lock()
+        self._timing = {"checkouts": 0, "timeouts": 0, "wait_total": 0.0, "wait_max": 0.0}
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._timing_lock:
+                self._timing["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._timing_lock:
+                t = self._timing
+                t["checkouts"] += 1
+                t["wait_total"] += waited
+                t["wait_max"] = max(t["wait_max"], waited)
+
+    def timing(self) -> dict:
+        with self._timing_lock:
+            t = dict(self._timing)
+        return {
+            "checkouts": t["checkouts"],
+            "timeouts": t["timeouts"],
+            "wait_ms_avg": round(t["wait_total"] / t["checkouts"] * 1000, 3) if t["checkouts"] else 0.0,
+            "wait_ms_max": round(t["wait_max"] * 1000, 3),
+        }
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    stats = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),  # negative until the pool has filled
+        })
+    if isinstance(pool, _TimedPoolMixin):
+        stats.update(pool.timing())
+    return stats
@@ -0,0 +1,122 @@
+# app/core/token_cache.py
+"""
+Short-lived cache of verified access tokens.
+
+get_current_user used to decode the JWT and SELECT the user on every
+request. A verified token now maps to the user's identity (id, email) for
+AUTH_CACHE_TTL_SECONDS (never past the token's own `exp`), so repeat
+requests with the same token skip both the signature check and the query.
+
+Entries are keyed by sha256(token), bounded to AUTH_CACHE_MAX_ENTRIES (LRU)
+and indexed by user id so they can be dropped when that user is deleted or
+their email/password changes (SQLAlchemy mapper events below). The events
+only see ORM flushes in this process; other processes and bulk UPDATEs are
+covered by the TTL.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set
+
+from sqlalchemy import event, inspect
+
+from app.models.user import User
+
+AUTH_CACHE_ENABLED = os.getenv("AUTH_CACHE", "1") != "0"
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+
+class AuthenticatedUser(NamedTuple):
+    """What request handlers get from get_current_user."""
+    id: int
+    email: str
+
+
+class TokenCache:
+    def __init__(self, max_entries: int = AUTH_CACHE_MAX_ENTRIES, ttl: float = AUTH_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, AuthenticatedUser)
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def _drop(self, key: str):
+        _, user = self._entries.pop(key)
+        keys = self._by_user.get(user.id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user.id]
+
+    def get(self, token: str) -> Optional[AuthenticatedUser]:
+        if not AUTH_CACHE_ENABLED:
+            return None
+        key = self._key(token)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] < time.time():
+                self._drop(key)
+                item = None
+            if item is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return item[1]
+
+    def put(self, token: str, user: AuthenticatedUser, token_exp: Optional[float] = None):
+        if not AUTH_CACHE_ENABLED:
+            return
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        key = self._key(token)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires_at, user)
+            self._by_user.setdefault(user.id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._drop(key)
+            self._counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            c = dict(self._counters)
+            size = len(self._entries)
+        total = c["hits"] + c["misses"]
+        return {**c, "entries": size, "max_entries": self.max_entries,
+                "hit_rate": c["hits"] / total if total else 0.0}
+
+
+token_cache = TokenCache()
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target):
+    token_cache.invalidate_user(target.id)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.password.history.has_changes() or state.attrs.email.history.has_changes():
+        token_cache.invalidate_user(target.id)
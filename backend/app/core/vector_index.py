@@ -0,0 +1,334 @@
+# app/core/vector_index.py
+"""
+Per-user in-process vector indexes for semantic search.
+
+Backends:
+  - "exact": brute-force cosine over a contiguous float32 matrix, one mat-vec
+    product per query and argpartition for top-k (baseline, always available)
+  - "hnsw":  approximate HNSW graph via hnswlib (optional dependency; falls
+    back to "exact" when it is not installed)
+
+When embeddings are stored as pgvector (see app.models.vector_type),
+`sql_search` pushes the top-k query into Postgres instead and no in-process
+index is kept.
+
+Select with the VECTOR_INDEX_BACKEND environment variable. Indexes are built
+lazily from insight_embeddings on first search and kept in sync by the
+cluster service on insight create/update/delete. Each index remembers a
+(row count, max embedding id) fingerprint of the rows it was built from, so
+writes handled by another worker process are picked up on the next search.
+"""
+import abc
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Float, LargeBinary, cast, func, type_coerce
+from sqlalchemy.orm import Session
+
+from app.models.insight import Insight
+from app.models.embedding import InsightEmbedding
+from app.models.vector_type import PACKED_FORMATS, EmbeddingVector, embedding_storage
+from app.core import embedding_codec
+
+logger = logging.getLogger(__name__)
+
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "exact")
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+Hit = Tuple[int, float]  # (insight_id, cosine score)
+
+
+def _unit(vec) -> np.ndarray:
+    vec = np.asarray(vec, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class VectorIndex(abc.ABC):
+    """Interface shared by all backends. Keys are insight ids."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.fingerprint: Optional[Tuple[int, int]] = None
+        self._lock = threading.RLock()
+
+    @abc.abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abc.abstractmethod
+    def __contains__(self, key: int) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def upsert(self, key: int, vec):
+        ...
+
+    @abc.abstractmethod
+    def remove(self, key: int):
+        ...
+
+    @abc.abstractmethod
+    def search(self, query, k: int = 10, min_score: float = -1.0) -> List[Hit]:
+        ...
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force cosine search on a preallocated, growable unit-vector matrix."""
+
+    def __init__(self, dim: int, capacity: int = 64):
+        super().__init__(dim)
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._keys = np.zeros(capacity, dtype=np.int64)
+        self._pos: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._pos
+
+    def _grow(self):
+        capacity = self._vectors.shape[0] * 2
+        size = len(self._pos)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:size] = self._vectors[:size]
+        keys = np.zeros(capacity, dtype=np.int64)
+        keys[:size] = self._keys[:size]
+        self._vectors, self._keys = vectors, keys
+
+    def upsert(self, key: int, vec):
+        with self._lock:
+            pos = self._pos.get(key)
+            if pos is None:
+                if len(self._pos) == self._vectors.shape[0]:
+                    self._grow()
+                pos = len(self._pos)
+                self._pos[key] = pos
+                self._keys[pos] = key
+            self._vectors[pos] = _unit(vec)
+
+    def remove(self, key: int):
+        with self._lock:
+            pos = self._pos.pop(key, None)
+            if pos is None:
+                return
+            last = len(self._pos)  # old size - 1
+            if pos != last:
+                # move the last row into the hole to keep the matrix contiguous
+                self._vectors[pos] = self._vectors[last]
+                self._keys[pos] = self._keys[last]
+                self._pos[int(self._keys[pos])] = pos
+
+    def search(self, query, k: int = 10, min_score: float = -1.0) -> List[Hit]:
+        with self._lock:
+            n = len(self._pos)
+            if n == 0 or k <= 0:
+                return []
+            scores = self._vectors[:n] @ _unit(query)
+            keys = self._keys[:n]
+        if k < n:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(-scores[top])]
+        return [(int(keys[i]), float(scores[i])) for i in top if scores[i] >= min_score]
+
+
+class HNSWIndex(VectorIndex):
+    """Approximate nearest neighbours on an hnswlib HNSW graph (cosine space)."""
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        import hnswlib
+
+        super().__init__(dim)
+        self._index = hnswlib.Index(space="cosine", dim=dim)
+        self._index.init_index(
+            max_elements=capacity, ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M, allow_replace_deleted=True
+        )
+        self._index.set_ef(HNSW_EF_SEARCH)
+        self._keys = set()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._keys
+
+    def upsert(self, key: int, vec):
+        # A key that still owns a slot (live, or removed but not yet reused) is
+        # updated in that slot. replace_deleted=True takes an arbitrary deleted
+        # slot and drops the lookup entry of its old label, so it is only safe
+        # for keys the graph does not hold at all.
+        with self._lock:
+            in_place = key in self._keys
+            if not in_place:
+                try:
+                    self._index.unmark_deleted(key)
+                    in_place = True
+                except RuntimeError:  # never added, or its slot was reused
+                    pass
+            if not in_place and self._index.get_current_count() >= self._index.get_max_elements():
+                self._index.resize_index(self._index.get_max_elements() * 2)
+            self._index.add_items(_unit(vec)[None, :], np.asarray([key]), replace_deleted=not in_place)
+            self._keys.add(key)
+
+    def remove(self, key: int):
+        with self._lock:
+            if key in self._keys:
+                self._index.mark_deleted(key)
+                self._keys.discard(key)
+
+    def search(self, query, k: int = 10, min_score: float = -1.0) -> List[Hit]:
+        with self._lock:
+            k = min(k, len(self._keys))
+            if k <= 0:
+                return []
+            self._index.set_ef(max(HNSW_EF_SEARCH, k))
+            labels, distances = self._index.knn_query(_unit(query)[None, :], k=k)
+        hits = [(int(key), 1.0 - float(dist)) for key, dist in zip(labels[0], distances[0])]
+        return [h for h in hits if h[1] >= min_score]
+
+
+def make_index(dim: int, backend: str = VECTOR_INDEX_BACKEND) -> VectorIndex:
+    if backend == "hnsw":
+        try:
+            return HNSWIndex(dim)
+        except ImportError:
+            logger.warning("hnswlib is not installed; falling back to exact vector search")
+            return ExactIndex(dim)
+    if backend != "exact":
+        raise ValueError(f"Unknown VECTOR_INDEX_BACKEND {backend!r}; expected 'exact' or 'hnsw'")
+    return ExactIndex(dim)
+
+
+# ---- per-user registry ----
+
+_indexes: Dict[int, VectorIndex] = {}
+_registry_lock = threading.Lock()
+
+
+def _user_embeddings(db: Session, user_id: int):
+    # packed formats come back as raw bytes; decoding is left to `index_from_rows`
+    vector = InsightEmbedding.vector
+    if embedding_storage() in PACKED_FORMATS:
+        vector = type_coerce(vector, LargeBinary())
+    return (
+        db.query(InsightEmbedding.insight_id, vector)
+        .join(Insight, Insight.id == InsightEmbedding.insight_id)
+        .filter(Insight.user_id == user_id)
+    )
+
+
+def _fingerprint(db: Session, user_id: int) -> Tuple[int, int]:
+    count, max_id = (
+        db.query(func.count(InsightEmbedding.id), func.max(InsightEmbedding.id))
+        .join(Insight, Insight.id == InsightEmbedding.insight_id)
+        .filter(Insight.user_id == user_id)
+        .one()
+    )
+    return int(count or 0), int(max_id or 0)
+
+
+def _as_vector(value) -> np.ndarray:
+    if isinstance(value, (bytes, memoryview)):
+        return embedding_codec.decode(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def load_user_index(db: Session, user_id: int) -> Tuple[Optional[VectorIndex], Tuple[int, int], list]:
+    """
+    DB half of an index lookup: (cached index, fingerprint, rows). The cached
+    index is returned when it still matches the stored rows; otherwise it is
+    None and `rows` holds the user's (insight_id, stored vector) pairs for
+    `index_from_rows`.
+    """
+    fingerprint = _fingerprint(db, user_id)
+    index = _indexes.get(user_id)
+    if index is not None and index.fingerprint == fingerprint:
+        return index, fingerprint, []
+    return None, fingerprint, _user_embeddings(db, user_id).all()
+
+
+def index_from_rows(user_id: int, fingerprint: Tuple[int, int], rows) -> Optional[VectorIndex]:
+    """
+    CPU half: decode `rows`, build a fresh index and cache it for `user_id`.
+    Touches no session, so it can run on the model executor.
+    """
+    index = None
+    if rows:
+        vectors = np.vstack([_as_vector(vector) for _, vector in rows])
+        index = make_index(vectors.shape[1])
+        for (insight_id, _), vec in zip(rows, vectors):
+            index.upsert(insight_id, vec)
+        index.fingerprint = fingerprint
+    with _registry_lock:
+        if index is None:
+            _indexes.pop(user_id, None)
+        else:
+            _indexes[user_id] = index
+    return index
+
+
+def get_user_index(db: Session, user_id: int) -> Optional[VectorIndex]:
+    """Cached index for `user_id`, rebuilt when the stored rows have changed."""
+    index, fingerprint, rows = load_user_index(db, user_id)
+    return index if index is not None else index_from_rows(user_id, fingerprint, rows)
+
+
+def index_upsert(user_id: int, insight_id: int, vec, embedding_id: int):
+    """Reflect a newly written embedding row in the user's cached index (if loaded)."""
+    index = _indexes.get(user_id)
+    if index is None:
+        return
+    with index._lock:
+        is_new = insight_id not in index
+        index.upsert(insight_id, vec)
+        if index.fingerprint is not None:
+            count, max_id = index.fingerprint
+            index.fingerprint = (count + (1 if is_new else 0), max(max_id, embedding_id))
+
+
+def index_remove(user_id: int, insight_id: int):
+    """Drop an insight from the user's cached index (if loaded)."""
+    index = _indexes.get(user_id)
+    if index is None:
+        return
+    with index._lock:
+        before = len(index)
+        index.remove(insight_id)
+        if index.fingerprint is not None and len(index) < before:
+            count, max_id = index.fingerprint
+            index.fingerprint = (count - 1, max_id)
+
+
+def drop_user_index(user_id: int):
+    """Forget the cached index; the next search rebuilds it from the DB."""
+    with _registry_lock:
+        _indexes.pop(user_id, None)
+
+
+# ---- SQL-side search (pgvector) ----
+
+def sql_search(db: Session, user_id: int, query, k: int = 10, min_score: float = -1.0) -> List[Hit]:
+    """
+    Top-k by cosine distance (`<=>`) evaluated in Postgres; the ORDER BY ...
+    LIMIT shape lets the planner use the HNSW index on insight_embeddings.
+    """
+    query_vec = cast(np.asarray(query, dtype=np.float32), EmbeddingVector())
+    distance = InsightEmbedding.vector.op("<=>", return_type=Float)(query_vec)
+    rows = (
+        db.query(InsightEmbedding.insight_id, distance)
+        .join(Insight, Insight.id == InsightEmbedding.insight_id)
+        .filter(Insight.user_id == user_id)
+        .order_by(distance)
+        .limit(k)
+        .all()
+    )
+    hits = [(insight_id, 1.0 - float(dist)) for insight_id, dist in rows]
+    return [h for h in hits if h[1] >= min_score]
@@ -0,0 +1,137 @@
+"""
+Export the summarizer, sentiment classifier and sentence embedder to ONNX
+with dynamic int8 quantization, for INFERENCE_BACKEND=onnx.
+
+Writes one directory per model under ONNX_MODEL_DIR plus a manifest.json
+naming the quantized files, which app.core.model_registry reads at load time.
+
+    python app/export_onnx.py                      # all models, avx512_vnni
+    python app/export_onnx.py --models embedder --arch avx2
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import glob
+import json
+import time
+
+from app.core.model_registry import (
+    EMBED_MODEL_NAME,
+    MODEL_REVISIONS,
+    ONNX_MANIFEST,
+    ONNX_MODEL_DIR,
+    SENTIMENT_MODEL,
+    SUMMARIZER_MODEL,
+)
+
+ARCHS = ("avx512_vnni", "avx512", "avx2", "arm64")
+MODELS = ("summarizer", "sentiment", "embedder")
+
+
+def _qconfig(arch):
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    # dynamic (weights int8, activations quantized at run time): no calibration data needed
+    return getattr(AutoQuantizationConfig, arch)(is_static=False, per_channel=False)
+
+
+def _size_mb(path):
+    return os.path.getsize(path) / 1e6
+
+
+def _quantize_dir(path, arch):
+    """Quantize every exported .onnx file in `path`; returns {original: quantized} file names."""
+    from optimum.onnxruntime import ORTQuantizer
+
+    quantized = {}
+    for onnx_path in sorted(glob.glob(os.path.join(path, "*.onnx"))):
+        name = os.path.basename(onnx_path)
+        if "quantized" in name:
+            continue
+        quantizer = ORTQuantizer.from_pretrained(path, file_name=name)
+        quantizer.quantize(save_dir=path, quantization_config=_qconfig(arch))
+        out = name.replace(".onnx", "_quantized.onnx")
+        print(f"   {name}: {_size_mb(onnx_path):.0f} MB -> {out}: {_size_mb(os.path.join(path, out)):.0f} MB")
+        quantized[name] = out
+    return quantized
+
+
+def export_summarizer(out_dir, arch):
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer
+
+    path = os.path.join(out_dir, "summarizer")
+    ORTModelForSeq2SeqLM.from_pretrained(
+        SUMMARIZER_MODEL, revision=MODEL_REVISIONS["summarizer"], export=True, use_cache=True
+    ).save_pretrained(path)
+    AutoTokenizer.from_pretrained(SUMMARIZER_MODEL, revision=MODEL_REVISIONS["summarizer"]).save_pretrained(path)
+    q = _quantize_dir(path, arch)
+    files = {"encoder_file_name": q["encoder_model.onnx"], "decoder_file_name": q["decoder_model.onnx"]}
+    if "decoder_with_past_model.onnx" in q:
+        files["decoder_with_past_file_name"] = q["decoder_with_past_model.onnx"]
+    return {"path": "summarizer", "files": files}
+
+
+def export_sentiment(out_dir, arch):
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from transformers import AutoTokenizer
+
+    path = os.path.join(out_dir, "sentiment")
+    ORTModelForSequenceClassification.from_pretrained(
+        SENTIMENT_MODEL, revision=MODEL_REVISIONS["sentiment"], export=True
+    ).save_pretrained(path)
+    AutoTokenizer.from_pretrained(SENTIMENT_MODEL, revision=MODEL_REVISIONS["sentiment"]).save_pretrained(path)
+    q = _quantize_dir(path, arch)
+    return {"path": "sentiment", "files": {"file_name": q["model.onnx"]}}
+
+
+def export_embedder(out_dir, arch):
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+    path = os.path.join(out_dir, "embedder")
+    model = SentenceTransformer(EMBED_MODEL_NAME, backend="onnx", revision=MODEL_REVISIONS["embedder"])
+    model.save_pretrained(path)
+    export_dynamic_quantized_onnx_model(model, arch, path)
+    file_name = f"onnx/model_qint8_{arch}.onnx"
+    print(f"   onnx/model.onnx -> {file_name}: {_size_mb(os.path.join(path, file_name)):.0f} MB")
+    return {"path": "embedder", "file_name": file_name}
+
+
+EXPORTERS = {"summarizer": export_summarizer, "sentiment": export_sentiment, "embedder": export_embedder}
+
+
+def main(models, out_dir, arch):
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, ONNX_MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    for name in models:
+        print(f"📦 Exporting {name} ({arch})")
+        started = time.perf_counter()
+        manifest[name] = {**EXPORTERS[name](out_dir, arch), "arch": arch, "revision": MODEL_REVISIONS[name]}
+        print(f"   done in {time.perf_counter() - started:.1f}s")
+        # rewrite after every model so a failure later keeps the finished exports usable
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    print(f"✅ ONNX models in {out_dir}; start the API with INFERENCE_BACKEND=onnx")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export and int8-quantize the NLP models to ONNX")
+    parser.add_argument("--models", default=",".join(MODELS), help=f"comma-separated subset of {', '.join(MODELS)}")
+    parser.add_argument("--out", default=ONNX_MODEL_DIR)
+    parser.add_argument("--arch", choices=ARCHS, default="avx512_vnni",
+                        help="quantization kernel target; avx2 for older x86, arm64 for Graviton/Apple")
+    args = parser.parse_args()
+
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    unknown = [m for m in models if m not in MODELS]
+    if unknown:
+        parser.error(f"unknown models: {', '.join(unknown)}")
+    main(models, args.out, args.arch)
@@ -0,0 +1,63 @@
+"""
+Bulk-import notes for one user from an NDJSON or CSV file (fields: title,
+content, tags), using the same batched pipeline as POST /insights/import.
+
+    python app/import_insights.py --email me@example.com notes.ndjson
+    python app/import_insights.py --email me@example.com --format csv archive.csv
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+from app.db import SessionLocal
+from app.models.user import User
+from app.core.bulk_import import IMPORT_FORMATS, import_records, read_records
+from app.core.clustering import CLUSTER_METHODS
+
+
+def main(path, email, fmt, batch_size, method, verbose):
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).first()
+        if user is None:
+            print(f"❌ No user with email {email}")
+            return 1
+
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            done = 0
+            for event in import_records(db, user.id, read_records(f, fmt), batch_size=batch_size, method=method):
+                status = event["status"]
+                if status == "error":
+                    print(f"⚠️  line {event['line']}: {event['error']}")
+                elif status == "ok":
+                    done += 1
+                    if verbose:
+                        print(f"line {event['line']} -> insight {event['id']}")
+                    elif done % 500 == 0:
+                        print(f"Imported {done} insights...")
+                elif status == "clustering":
+                    print("Clustering...")
+                elif status == "done":
+                    print(f"✅ Imported {event['imported']} insights ({event['failed']} failed) into "
+                          f"{event['clusters']} clusters in {event['seconds']}s "
+                          f"({event['records_per_second']} records/s)")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-import insights from an NDJSON or CSV file")
+    parser.add_argument("path")
+    parser.add_argument("--email", required=True, help="owner of the imported insights")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default=None,
+                        help="default: from the file extension (.csv = csv, else ndjson)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--method", choices=CLUSTER_METHODS, default="incremental")
+    parser.add_argument("--verbose", action="store_true", help="print every imported record")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    sys.exit(main(args.path, args.email, fmt, args.batch_size, args.method, args.verbose))
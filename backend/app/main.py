@@ -2,10 +2,17 @@
 from fastapi import FastAPI
 from app.routes.auth import router as auth_router
 from app.routes.insight import router as insight_router
+from app.routes.search import router as search_router
+from app.routes.metrics import router as metrics_router
 from app.db import engine
 from app.models.user import Base as UserBase
 from app.models.insight import Base as InsightBase
 from app.models.embedding import InsightEmbedding  # ensures model import for Alembic / create_all
+from app.models.cluster import InsightCluster
+from app.models.enrichment import EnrichmentJob
+from app.models.nlp_cache import NlpCacheEntry
+from app.core.enrichment import resume_pending
+from app.core.model_registry import registry
 from fastapi.middleware.cors import CORSMiddleware
 
 # create tables if missing (safe in dev)
@@ -21,7 +28,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(auth_router, prefix="/auth")
 app.include_router(insight_router)  # router already has prefix /insights
+app.include_router(search_router)
+app.include_router(metrics_router)
+
+
+@app.on_event("startup")
+def warm_up_models():
+    # models load lazily on first use; WARMUP_MODELS=all|name,... preloads them off the request path
+    registry.warm_up_in_background()
+
+
+@app.on_event("startup")
+def resume_enrichment_jobs():
+    # jobs are durable in Postgres; pick up whatever a previous process left behind
+    resume_pending()
@@ -1 +1,7 @@
 from app.models.benchmark import BenchmarkResult
+from app.models.user import User
+from app.models.insight import Insight
+from app.models.embedding import InsightEmbedding
+from app.models.cluster import InsightCluster
+from app.models.enrichment import EnrichmentJob
+from app.models.nlp_cache import NlpCacheEntry
@@ -1,14 +1,27 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Boolean, Column, Integer, String, Float, DateTime, false
 from sqlalchemy.sql import func
 from app.db import Base
 
 class BenchmarkResult(Base):
+    """One workload measurement; rows of one benchmark run share a run_id (see app.core.benchmark_store)."""
     __tablename__ = "benchmark_results"
 
     id = Column(Integer, primary_key=True, index=True)
-    model_name = Column(String, nullable=False)
+    run_id = Column(String(32), index=True)
+    workload = Column(String(64), index=True)       # embed | cluster_texts | search | ... | summarize
+    model_name = Column(String, nullable=True)      # null for workloads not bound to one model
     device = Column(String, nullable=False)   # 'CPU' or 'GPU'
-    avg_time = Column(Float, nullable=False)
+    corpus_size = Column(Integer)
+    batch_size = Column(Integer)
+    avg_time = Column(Float, nullable=False)        # seconds per operation
+    p50_ms = Column(Float)
+    p95_ms = Column(Float)
+    p99_ms = Column(Float)
+    throughput = Column(Float)                      # items per second
+    peak_rss_mb = Column(Float)
     vram_used_gb = Column(Float)
     vram_total_gb = Column(Float)
+    git_revision = Column(String(64))
+    host_fingerprint = Column(String(16), index=True)
+    is_baseline = Column(Boolean, nullable=False, server_default=false(), default=False)
     run_date = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, UniqueConstraint, func
+from sqlalchemy.dialects.postgresql import ARRAY
+from app.db import Base
+
+class InsightCluster(Base):
+    """Persisted per-user cluster: running-mean centroid plus member count."""
+    __tablename__ = "insight_clusters"
+    __table_args__ = (
+        UniqueConstraint("user_id", "cluster_id", name="uq_insight_clusters_user_cluster"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    cluster_id = Column(Integer, nullable=False)   # per-user label, matches InsightEmbedding.cluster_id
+    centroid = Column(ARRAY(Float), nullable=False)
+    member_count = Column(Integer, nullable=False, default=0)
+    representative_insight_id = Column(Integer, ForeignKey("insights.id", ondelete="SET NULL"), nullable=True)
+    representative_score = Column(Float, nullable=True)   # cosine(representative, centroid) when it was chosen
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
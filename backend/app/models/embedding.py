@@ -1,11 +1,11 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy import Column, Integer, ForeignKey
 from app.db import Base
+from app.models.vector_type import EmbeddingVector
 
 class InsightEmbedding(Base):
     __tablename__ = "insight_embeddings"
 
     id = Column(Integer, primary_key=True, index=True)
-    insight_id = Column(Integer, ForeignKey("insights.id", ondelete="CASCADE"), nullable=False)
-    vector = Column(ARRAY(Float), nullable=False)
+    insight_id = Column(Integer, ForeignKey("insights.id", ondelete="CASCADE"), nullable=False, index=True)
+    vector = Column(EmbeddingVector(), nullable=False)
     cluster_id = Column(Integer, index=True)
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func
+from app.db import Base
+
+class EnrichmentJob(Base):
+    """Durable NLP enrichment job; one row per insight, reset when it needs re-running."""
+    __tablename__ = "enrichment_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    insight_id = Column(Integer, ForeignKey("insights.id", ondelete="CASCADE"), nullable=False, unique=True)
+    status = Column(String(20), nullable=False, default="pending", index=True)  # pending | running | done | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    claim_token = Column(String(32), nullable=True)  # set per claim; finishing requires the same token
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
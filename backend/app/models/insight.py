@@ -1,17 +1,23 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from app.db import Base
 
 class Insight(Base):
     __tablename__ = "insights"
+    __table_args__ = (
+        # keyset pagination of GET /insights/ (newest first per user)
+        Index("ix_insights_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     content = Column(Text, nullable=False)
+    content_hash = Column(String(64), nullable=True)  # sha256 of content, same key the NLP cache uses
     tags = Column(String, nullable=True)
     summary = Column(Text, nullable=True)
     keywords = Column(String, nullable=True)
     sentiment = Column(String(50), nullable=True)
+    enrichment_status = Column(String(20), nullable=False, server_default="done")  # pending | done | failed
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, LargeBinary, DateTime, UniqueConstraint, func
+from sqlalchemy.dialects.postgresql import JSONB
+from app.db import Base
+
+class NlpCacheEntry(Base):
+    """Persistent tier of the content-addressed NLP cache (see app.core.nlp_cache)."""
+    __tablename__ = "nlp_cache"
+    __table_args__ = (
+        UniqueConstraint("kind", "model_name", "model_revision", "text_hash", name="uq_nlp_cache_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(32), nullable=False)            # summary | keywords | sentiment | embedding (+ version)
+    model_name = Column(String, nullable=False)
+    model_revision = Column(String, nullable=False)
+    text_hash = Column(String(64), nullable=False)      # sha256 hex of the input text
+    value = Column(JSONB, nullable=True)                # summary / keywords / sentiment
+    vector = Column(LargeBinary, nullable=True)         # embeddings, packed float32
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""
+Column type for stored embeddings.
+
+EMBEDDING_STORAGE selects the physical format:
+  - "array"    (default) Postgres double precision[]
+  - "pgvector" native pgvector `vector(EMBEDDING_DIM)` (float32) with an ANN
+               index, so nearest-neighbour queries run inside Postgres
+  - "float32"  raw little-endian float32 bytes in a bytea column, decoded
+               zero-copy with np.frombuffer (see app.core.embedding_codec)
+  - "int8"     bytea holding a per-vector scale plus int8 components
+
+A non-array format is only used when the `insight_embeddings.vector` column
+actually has the matching type (or, before the table exists, the format can
+be created: pgvector additionally needs the Python package and the
+extension). Otherwise the column falls back to the array format. The check
+runs once, on the engine's first connection, before any statement is
+compiled.
+"""
+import logging
+import os
+
+import numpy as np
+from sqlalchemy import Float, LargeBinary, event
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.types import TypeDecorator
+
+from app.db import engine
+from app.core import embedding_codec
+
+try:
+    from pgvector.sqlalchemy import Vector
+except ImportError:  # optional dependency
+    Vector = None
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "384"))  # all-MiniLM-L6-v2
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "array")
+PACKED_FORMATS = ("float32", "int8")
+
+_state = {"storage": "array"}
+
+
+def embedding_storage() -> str:
+    """Storage format in effect after the first-connection check."""
+    return _state["storage"]
+
+
+def pgvector_enabled() -> bool:
+    return _state["storage"] == "pgvector"
+
+
+def _resolve_storage(cursor) -> str:
+    if EMBEDDING_STORAGE == "array":
+        return "array"
+    if EMBEDDING_STORAGE == "pgvector" and Vector is None:
+        logger.warning("EMBEDDING_STORAGE=pgvector but the pgvector package is not installed; using array storage")
+        return "array"
+
+    cursor.execute(
+        "SELECT udt_name FROM information_schema.columns "
+        "WHERE table_name = 'insight_embeddings' AND column_name = 'vector'"
+    )
+    row = cursor.fetchone()
+    if EMBEDDING_STORAGE == "pgvector":
+        if row is not None:
+            ok = row[0] == "vector"
+        else:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'vector'")
+            ok = cursor.fetchone() is not None
+    elif EMBEDDING_STORAGE in PACKED_FORMATS:
+        ok = row is None or row[0] == "bytea"
+    else:
+        raise ValueError(f"Unknown EMBEDDING_STORAGE {EMBEDDING_STORAGE!r}")
+
+    if not ok:
+        logger.warning("EMBEDDING_STORAGE=%s does not match the insight_embeddings.vector column; "
+                       "using array storage (run the migrations to convert)", EMBEDDING_STORAGE)
+        return "array"
+    return EMBEDDING_STORAGE
+
+
+def _detect_storage(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        _state["storage"] = _resolve_storage(cursor)
+    finally:
+        cursor.close()
+        dbapi_connection.rollback()
+
+
+event.listen(engine, "first_connect", _detect_storage)
+
+
+def register_async_codecs(async_engine):
+    """asyncpg has no text fallback for `vector`; register pgvector's codec on each new connection."""
+    def _register(dbapi_connection, connection_record):
+        if pgvector_enabled():
+            from pgvector.asyncpg import register_vector
+            dbapi_connection.run_async(register_vector)
+
+    event.listen(async_engine.sync_engine, "connect", _register)
+
+
+class EmbeddingVector(TypeDecorator):
+    """Embedding column whose storage format is resolved per EMBEDDING_STORAGE."""
+
+    impl = ARRAY(Float)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        storage = _state["storage"]
+        if storage == "pgvector":
+            return dialect.type_descriptor(Vector(EMBEDDING_DIM))
+        if storage in PACKED_FORMATS:
+            return dialect.type_descriptor(LargeBinary())
+        return dialect.type_descriptor(ARRAY(Float))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        storage = _state["storage"]
+        if storage in PACKED_FORMATS:
+            return embedding_codec.encode(value, storage)
+        if isinstance(value, np.ndarray):
+            # array/pgvector accept plain lists; psycopg2 cannot adapt numpy scalars
+            return value.astype(float).tolist()
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and _state["storage"] in PACKED_FORMATS:
+            return embedding_codec.decode(value)
+        return value
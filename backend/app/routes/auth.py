@@ -1,54 +1,67 @@
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-import bcrypt
-from jose import jwt, JWTError
-from app.db import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_async_db
 from app.models.user import User
 from app.schemas.user import UserCreate
 from app.core.auth_utils import create_access_token
+from app.core.deps import get_current_user
+from app.core.password_hashing import HashingOverloaded, hash_password, verify_password
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 router = APIRouter(tags=["Auth"])
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+def _overloaded():
+    return HTTPException(status_code=429, detail="Too many concurrent logins, retry shortly",
+                         headers={"Retry-After": "1"})
+
+async def _user_by_email(db: AsyncSession, email: str):
+    return (await db.execute(select(User).where(User.email == email))).scalars().first()
 
 @router.post("/register")
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user.email).first()
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing_user = await _user_by_email(db, user.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_pw = hash_password(user.password)
+    # bcrypt is deliberately slow; it runs on the bounded hashing pool
+    try:
+        hashed_pw = await hash_password(user.password)
+    except HashingOverloaded:
+        raise _overloaded()
     new_user = User(email=user.email, password=hashed_pw)
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     return {"id": new_user.id, "email": new_user.email}
 
 @router.post("/login")
-def login(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def login(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await _user_by_email(db, user.email)
     if not db_user:
         raise HTTPException(status_code=400, detail="Invalid email or password")
 
-    if not bcrypt.checkpw(user.password.encode("utf-8"), db_user.password.encode("utf-8")):
+    try:
+        ok, needs_rehash = await verify_password(user.password, db_user.password)
+    except HashingOverloaded:
+        raise _overloaded()
+    if not ok:
         raise HTTPException(status_code=400, detail="Invalid email or password")
 
-    token = create_access_token({"sub": db_user.email})
+    if needs_rehash:
+        # BCRYPT_ROUNDS changed since this hash was made; upgrade it while we have the password
+        try:
+            db_user.password = await hash_password(user.password)
+            await db.commit()
+        except HashingOverloaded:
+            pass  # the next login upgrades it
+
+    # uid lets get_current_user resolve the user by primary key and cache by id
+    token = create_access_token({"sub": db_user.email, "uid": db_user.id})
     return {"access_token": token, "token_type": "bearer"}
 
 
 @router.get("/me")
-def get_me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    try:
-        payload = jwt.decode(token, "supersecretkey123", algorithms=["HS256"])
-        email: str = payload.get("sub")
-    except:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-
-    user = db.query(User).filter(User.email == email).first()
-    return {"id": user.id, "email": user.email}
\ No newline at end of file
+async def get_me(current_user = Depends(get_current_user)):
+    return {"id": current_user.id, "email": current_user.email}
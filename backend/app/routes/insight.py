@@ -1,84 +1,133 @@
 # app/routes/insight.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db import get_db
+import base64
+import io
+import json
+import tempfile
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import any_, func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import SessionLocal, get_async_db
 from app.models.insight import Insight
-from app.schemas.insight import InsightCreate, InsightResponse, InsightUpdate
+from app.schemas.insight import InsightCreate, InsightResponse, InsightUpdate, EnrichmentStatusResponse
 from app.core.deps import get_current_user
 from app.core.nlp import analyze_text
 from app.models.embedding import InsightEmbedding
 from app.schemas.cluster import ClusterResponse
-from app.core.clustering import generate_embedding, cluster_texts
+from app.core.clustering import CLUSTER_METHODS
+from app.core.enrichment import enqueue, schedule, job_status
+from app.core.nlp_cache import text_hash
+from app.core.cluster_service import remove_insight, get_user_clusters, recluster_user_job
+from app.core.vector_index import index_remove
 from app.schemas.extract import InsightExtractionRequest, InsightExtractionResponse
 from app.core.insight_extractor import extract_insights
+from app.core.model_executor import run_model
+from app.core.bulk_import import IMPORT_FORMATS, import_records, read_records
+from app.core.export import EXPORT_FORMATS, EXPORT_MEDIA_TYPES, export_chunks, format_available
 
 
 router = APIRouter(prefix="/insights", tags=["Insights"])
 
 @router.post("/", response_model=InsightResponse)
-def create_insight(
+async def create_insight(
     data: InsightCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    analysis = analyze_text(data.content)
-
     new_insight = Insight(
         title=data.title,
         content=data.content,
+        content_hash=text_hash(data.content),
         tags=data.tags,
         user_id=current_user.id,
-        summary=analysis.get("summary"),
-        keywords=",".join(analysis.get("keywords", [])),
-        sentiment=analysis.get("sentiment")
+        enrichment_status="pending"
     )
 
     db.add(new_insight)
-    db.commit()
-    db.refresh(new_insight)
-
-    # compute cluster for all user's insights (interactive)
-    insights = db.query(Insight).filter(Insight.user_id == current_user.id).all()
-    texts = [ins.summary or "" for ins in insights]
-    ids = [ins.id for ins in insights]
-
-    clusters = cluster_texts(texts, insight_ids=ids)
-
-    # delete old embeddings for user's insights and write fresh ones
-    db.query(InsightEmbedding).filter(InsightEmbedding.insight_id.in_(ids)).delete(synchronize_session=False)
-    db.commit()
-
-    for ins in insights:
-        vec = generate_embedding(ins.summary or "")
-        # find cluster id
-        assigned = None
-        for c in clusters:
-            if ins.id in c['insight_ids']:
-                assigned = c['cluster_id']
-                break
-        entry = InsightEmbedding(insight_id=ins.id, vector=vec, cluster_id=assigned)
-        db.add(entry)
-    db.commit()
+    await db.flush()
+    # summary / keywords / sentiment, embedding and cluster are filled in by the
+    # enrichment workers; poll GET /insights/{id}/status
+    await db.run_sync(enqueue, new_insight)
+    await db.commit()
+    await db.refresh(new_insight)
+    schedule(new_insight.id)
 
     return new_insight
 
 
+def _encode_cursor(created_at: datetime, insight_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), insight_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, insight_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(insight_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/", response_model=list[InsightResponse])
-def get_insights(
-    db: Session = Depends(get_db),
+async def get_insights(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    sentiment: Optional[str] = None,
+    tag: Optional[str] = None,
+    cluster_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    return db.query(Insight).filter(Insight.user_id == current_user.id).all()
+    """
+    Newest first, one page at a time. Keyset pagination on (created_at, id)
+    walks ix_insights_user_created_id, so every page costs the same however
+    long the history is. The cursor for the next page is returned in the
+    X-Next-Cursor header (absent on the last page).
+    """
+    # only the columns InsightResponse serializes; never the content Text
+    q = select(
+        Insight.id,
+        Insight.summary,
+        Insight.sentiment,
+        Insight.keywords,
+        Insight.user_id,
+        Insight.enrichment_status,
+        Insight.created_at,
+    ).where(Insight.user_id == current_user.id)
+
+    if sentiment is not None:
+        q = q.where(Insight.sentiment == sentiment)
+    if tag is not None:
+        q = q.where(tag == any_(func.regexp_split_to_array(Insight.tags, r"\s*,\s*")))
+    if cluster_id is not None:
+        q = q.join(InsightEmbedding, InsightEmbedding.insight_id == Insight.id).where(
+            InsightEmbedding.cluster_id == cluster_id
+        )
+    if cursor is not None:
+        created_at, last_id = _decode_cursor(cursor)
+        q = q.where(
+            tuple_(Insight.created_at, Insight.id) < tuple_(literal(created_at, Insight.created_at.type), last_id)
+        )
+
+    rows = (await db.execute(q.order_by(Insight.created_at.desc(), Insight.id.desc()).limit(limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows
 
 
 @router.patch("/{insight_id}", response_model=InsightResponse)
-def update_insight(
+async def update_insight(
     insight_id: int,
     data: InsightUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    insight = db.query(Insight).filter(Insight.id == insight_id).first()
+    insight = await db.get(Insight, insight_id)
     if not insight:
         raise HTTPException(status_code=404, detail="Insight not found")
     if insight.user_id != current_user.id:
@@ -86,48 +135,163 @@ def update_insight(
 
     if data.title is not None:
         insight.title = data.title
-    if data.content is not None:
-        insight.content = data.content
     if data.tags is not None:
         insight.tags = data.tags
 
-    db.commit()
-    db.refresh(insight)
+    # only a real content change invalidates summary / keywords / sentiment and
+    # the embedding; title and tag edits never touch the models
+    content_changed = False
+    if data.content is not None:
+        new_hash = text_hash(data.content)
+        content_changed = new_hash != insight.content_hash
+        insight.content = data.content
+        insight.content_hash = new_hash
+    if content_changed:
+        await db.run_sync(enqueue, insight)
+
+    await db.commit()
+    await db.refresh(insight)
+    if content_changed:
+        schedule(insight.id)
     return insight
 
 
+@router.get("/{insight_id}/status", response_model=EnrichmentStatusResponse)
+async def get_enrichment_status(
+    insight_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    insight = (await db.execute(
+        select(Insight).where(Insight.id == insight_id, Insight.user_id == current_user.id)
+    )).scalars().first()
+    if not insight:
+        raise HTTPException(status_code=404, detail="Insight not found")
+    return await db.run_sync(job_status, insight)
+
+
 @router.delete("/{insight_id}")
-def delete_insight(
+async def delete_insight(
     insight_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    insight = db.query(Insight).filter(Insight.id == insight_id).first()
+    insight = await db.get(Insight, insight_id)
     if not insight:
         raise HTTPException(status_code=404, detail="Insight not found.")
     if insight.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this insight.")
 
-    db.delete(insight)
-    db.commit()
+    await db.run_sync(remove_insight, insight)
+    await db.delete(insight)
+    await db.commit()
+    index_remove(current_user.id, insight_id)
     return {"message": "Deleted successfully"}
 
 
 @router.get("/clusters")
-def get_clusters(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+async def get_clusters(db: AsyncSession = Depends(get_async_db), current_user=Depends(get_current_user)):
+    # persisted clusters are kept current on every write; this is a plain read
+    return {"clusters": await db.run_sync(get_user_clusters, current_user.id)}
 
-    insights = db.query(Insight).filter(Insight.user_id == current_user.id).all()
-    if not insights:
-        return {"clusters": []}
 
-    texts = [i.summary for i in insights]
-    ids = [i.id for i in insights]
+@router.post("/clusters/rebuild", status_code=202)
+async def rebuild_clusters(
+    background_tasks: BackgroundTasks,
+    method: str = Query("incremental", description="incremental | agglomerative"),
+    current_user=Depends(get_current_user)
+):
+    """
+    Schedule a full re-cluster of the current user's insights. Runs after the
+    response is sent, so it never adds to request latency.
+    """
+    if method not in CLUSTER_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(CLUSTER_METHODS)}")
+    background_tasks.add_task(recluster_user_job, current_user.id, method=method)
+    return {"status": "scheduled", "method": method}
+
+# uploads are spooled in memory up to this size, then to a temp file
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+def _import_events(upload, user_id: int, fmt: str, batch_size: int, method: str):
+    # sync generator: StreamingResponse iterates it in the threadpool, off the event loop
+    db = SessionLocal()
+    try:
+        text = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+        for event in import_records(db, user_id, read_records(text, fmt), batch_size=batch_size, method=method):
+            yield json.dumps(event) + "\n"
+    finally:
+        db.close()
+        upload.close()
+
+
+@router.post("/import")
+async def import_insights(
+    request: Request,
+    format: str = Query("ndjson", description="ndjson | csv"),
+    batch_size: int = Query(64, ge=1, le=1000),
+    method: str = Query("incremental", description="incremental | agglomerative"),
+    current_user = Depends(get_current_user)
+):
+    """
+    Bulk import from a streamed NDJSON or CSV body (fields: title, content,
+    tags). NLP and embedding run in batches, clustering once at the end.
+    Responds with an NDJSON stream: one event per record
+    ({"line", "status": "ok", "id"} or {"line", "status": "error", "error"}),
+    then {"status": "done", ...}.
+    """
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(IMPORT_FORMATS)}")
+    if method not in CLUSTER_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(CLUSTER_METHODS)}")
+
+    upload = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES, mode="w+b")
+    async for chunk in request.stream():
+        upload.write(chunk)
+    upload.seek(0)
+
+    return StreamingResponse(
+        _import_events(upload, current_user.id, format, batch_size, method),
+        media_type="application/x-ndjson",
+    )
+
+
+def _export_stream(user_id: int, fmt: str, include_vectors: bool):
+    # sync generator with its own session: the server-side cursor stays open while the response streams
+    db = SessionLocal()
+    try:
+        yield from export_chunks(db, user_id, fmt=fmt, include_vectors=include_vectors)
+    finally:
+        db.close()
+
+
+@router.get("/export")
+async def export_insights(
+    format: str = Query("ndjson", description="ndjson | arrow | parquet"),
+    include_vectors: bool = Query(True),
+    current_user = Depends(get_current_user)
+):
+    """
+    Stream every insight of the current user with keywords, sentiment,
+    cluster id and (optionally) its embedding. Memory use is constant in the
+    number of rows.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if not format_available(format):
+        raise HTTPException(status_code=400, detail=f"{format} export requires pyarrow on the server")
+
+    ext = {"ndjson": "ndjson", "arrow": "arrows", "parquet": "parquet"}[format]
+    return StreamingResponse(
+        _export_stream(current_user.id, format, include_vectors),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="insights.{ext}"'},
+    )
 
-    clusters = cluster_texts(texts, ids)
-    return {"clusters": clusters}
 
 @router.post("/extract", response_model=InsightExtractionResponse)
-def extract_from_raw(
+async def extract_from_raw(
     payload: InsightExtractionRequest,
     current_user = Depends(get_current_user)
 ):
@@ -135,7 +299,8 @@ def extract_from_raw(
     Take raw note content, run NLP + extraction, return structured insights.
     Does NOT save anything to DB.
     """
-    analysis = analyze_text(payload.content)
+    # model inference runs on the model executor, never on the event loop
+    analysis = await run_model(analyze_text, payload.content)
 
     extracted = extract_insights(
         text=payload.content,
@@ -147,19 +312,17 @@ def extract_from_raw(
     return extracted
 
 @router.get("/{insight_id}/extract", response_model=InsightExtractionResponse)
-def extract_from_saved(
+async def extract_from_saved(
     insight_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """
     Load an existing insight by ID, then run extraction on its summary/content.
     """
-    ins = (
-        db.query(Insight)
-        .filter(Insight.id == insight_id, Insight.user_id == current_user.id)
-        .first()
-    )
+    ins = (await db.execute(
+        select(Insight).where(Insight.id == insight_id, Insight.user_id == current_user.id)
+    )).scalars().first()
 
     if not ins:
         raise HTTPException(status_code=404, detail="Insight not found")
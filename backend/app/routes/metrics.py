@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+from app.core.nlp import analyze_batcher
+from app.core.clustering import encoder_stats
+from app.core.model_registry import registry
+from app.core.nlp_cache import cache
+from app.core.pool_metrics import pool_stats
+from app.core.token_cache import token_cache
+from app.core.password_hashing import hashing_pool
+from app.db import engine, get_async_engine
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("/")
+def get_metrics():
+    """Runtime counters for monitoring (no auth, no DB access)."""
+    return {
+        "nlp_batcher": analyze_batcher.stats(),
+        "models": registry.stats(),
+        "nlp_cache": cache.stats(),
+        "embedder": encoder_stats(),
+        "db_pool": _db_pools(),
+        "auth_cache": token_cache.stats(),
+        "password_hashing": hashing_pool.stats(),
+    }
+
+
+def _db_pools() -> dict:
+    pools = {"sync": pool_stats(engine)}
+    async_engine = get_async_engine(create=False)
+    if async_engine is not None:
+        pools["async"] = pool_stats(async_engine.sync_engine)
+    return pools
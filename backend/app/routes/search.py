@@ -1,46 +1,50 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from app.db import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_async_db
 from app.core.deps import get_current_user
+from app.core.clustering import embed_query
+from app.core.vector_index import index_from_rows, load_user_index, sql_search
+from app.models.vector_type import pgvector_enabled
 from app.models.insight import Insight
-import numpy as np
+from app.core.model_executor import run_model
 
 router = APIRouter(prefix="/search", tags=["Search"])
 
 
 @router.get("/")
-def semantic_search(
+async def semantic_search(
     q: str = Query(..., description="Search query"),
-    db: Session = Depends(get_db),
+    k: int = Query(10, ge=1, le=100, description="Number of results to return"),
+    min_score: float = Query(0.0, ge=-1.0, le=1.0, description="Minimum cosine similarity"),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     # 1. Convert query text → embedding
-    query_vector = generate_embedding(q)
-
-    # 2. Fetch all insights for the user
-    insights = db.query(Insight).filter(Insight.user_id == current_user.id).all()
-
-    if not insights:
-        return {"results": []}
-
-    # 3. Collect embeddings from DB
-    results = []
-    for ins in insights:
-        if not ins.embedding:
-            continue
-
-        vec = np.array(ins.embedding.vector)
-        score = np.dot(query_vector, vec) / (
-            np.linalg.norm(query_vector) * np.linalg.norm(vec)
-        )
-
-        results.append({
-            "id": ins.id,
-            "summary": ins.summary,
-            "score": float(score)
-        })
-
-    # 4. Sort by similarity score
-    results = sorted(results, key=lambda x: x["score"], reverse=True)
-
+    query_vector = await run_model(embed_query, q)
+
+    # 2. Top-k lookup: in Postgres when vectors are stored as pgvector, else in
+    #    the user's in-process index (built from the DB once, then cached; the
+    #    build decodes every vector, so it runs on the model executor)
+    if pgvector_enabled():
+        hits = await db.run_sync(sql_search, current_user.id, query_vector, k=k, min_score=min_score)
+    else:
+        index, fingerprint, rows = await db.run_sync(load_user_index, current_user.id)
+        if index is None:
+            index = await run_model(index_from_rows, current_user.id, fingerprint, rows)
+        hits = await run_model(index.search, query_vector, k=k, min_score=min_score) if index is not None else []
+    if not hits:
+        return {"query": q, "results": []}
+
+    # 3. Fetch summaries for the hits only
+    summaries = dict((await db.execute(
+        select(Insight.id, Insight.summary)
+        .where(Insight.id.in_([insight_id for insight_id, _ in hits]))
+    )).all())
+
+    results = [
+        {"id": insight_id, "summary": summaries[insight_id], "score": score}
+        for insight_id, score in hits
+        if insight_id in summaries
+    ]
     return {"query": q, "results": results}
@@ -18,6 +18,13 @@ class InsightResponse(BaseModel):
     sentiment: Optional[str] = None
     keywords: Optional[str] = None
     user_id: int
+    enrichment_status: Optional[str] = None
 
     class Config:
         from_attributes = True
+
+class EnrichmentStatusResponse(BaseModel):
+    insight_id: int
+    enrichment_status: str
+    attempts: int = 0
+    last_error: Optional[str] = None
@@ -0,0 +1,55 @@
+import threading
+
+import pytest
+
+from app.core import nlp_cache
+from app.core.nlp_cache import NlpCache
+
+
+def _compute(texts):
+    return [t.upper() for t in texts]
+
+
+def test_memory_only_call_skips_db_tier(monkeypatch):
+    cache = NlpCache(use_db=True)
+
+    def no_db(*args):
+        pytest.fail("DB tier used")
+
+    monkeypatch.setattr(cache, "_db_get", no_db)
+    monkeypatch.setattr(cache, "_db_put", no_db)
+    assert cache.get_or_compute("summary", "m", "r", ["a", "b", "a"], _compute, use_db=False) == ["A", "B", "A"]
+    # second call is served from memory
+    assert cache.get_or_compute("summary", "m", "r", ["a"], lambda texts: pytest.fail("recomputed"),
+                                use_db=False) == ["A"]
+
+
+def test_concurrent_writes_prune_once_per_threshold(monkeypatch):
+    monkeypatch.setattr(nlp_cache, "NLP_CACHE_PRUNE_EVERY", 100)
+    monkeypatch.setattr(nlp_cache, "SessionLocal", lambda: _NullSession())
+    cache = NlpCache(use_db=True)
+    prunes = []
+    monkeypatch.setattr(cache, "prune", lambda: prunes.append(1))
+
+    def writer(n):
+        for i in range(50):
+            cache._db_put("summary", "m", "r", {f"{n}-{i}": "v"})
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(prunes) == 4
+    assert cache._writes_since_prune == 0
+
+
+class _NullSession:
+    def execute(self, stmt):
+        pass
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,100 @@
+import importlib.util
+
+import numpy as np
+import pytest
+
+from app.core import embedding_codec
+from app.core.vector_index import ExactIndex, HNSWIndex, VectorIndex, drop_user_index, index_from_rows
+
+needs_hnswlib = pytest.mark.skipif(importlib.util.find_spec("hnswlib") is None, reason="hnswlib not installed")
+
+DIM = 8
+
+
+def _vec(seed):
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+def _keys(hits):
+    return {key for key, _ in hits}
+
+
+@needs_hnswlib
+def test_hnsw_upsert_existing_then_reuse_deleted_slot():
+    index = HNSWIndex(DIM)
+    for key in (1, 2, 3):
+        index.upsert(key, _vec(key))
+
+    index.remove(1)               # leaves a deleted slot labelled 1, ahead of 2's
+    index.upsert(2, _vec(20))     # update in place, must not take 1's slot
+    index.remove(3)
+    index.upsert(4, _vec(4))      # new key reuses a deleted slot
+
+    hits = index.search(_vec(20), k=10)
+    assert _keys(hits) == {2, 4}
+    assert hits[0][0] == 2 and hits[0][1] == pytest.approx(1.0, abs=1e-4)
+
+    index.remove(2)               # raised "Label not found" when 2's lookup entry was lost
+    index.remove(4)
+    assert len(index) == 0
+    assert index.search(_vec(20), k=10) == []
+
+
+@needs_hnswlib
+def test_hnsw_readd_removed_key():
+    index = HNSWIndex(DIM)
+    for key in (1, 2):
+        index.upsert(key, _vec(key))
+    index.remove(1)
+    index.remove(2)
+    index.upsert(1, _vec(11))     # revives 1's own slot
+    index.upsert(3, _vec(3))      # takes 2's slot
+
+    assert _keys(index.search(_vec(11), k=10)) == {1, 3}
+    index.remove(1)
+    index.remove(3)
+    assert len(index) == 0
+
+
+@needs_hnswlib
+def test_hnsw_random_upserts_and_removes_stay_consistent():
+    rng = np.random.default_rng(0)
+    index = HNSWIndex(DIM, capacity=16)
+    live = {}
+    for step in range(400):
+        key = int(rng.integers(1, 25))
+        if key in live and rng.random() < 0.4:
+            index.remove(key)
+            del live[key]
+        else:
+            live[key] = _vec(1000 + step)
+            index.upsert(key, live[key])
+
+    assert len(index) == len(live)
+    for key, vec in live.items():
+        assert index.search(vec, k=1)[0][0] == key
+    for key in list(live):
+        index.remove(key)
+    assert len(index) == 0
+
+
+def test_vector_index_is_abstract():
+    with pytest.raises(TypeError):
+        VectorIndex(DIM)
+
+
+def test_index_from_rows_decodes_stored_formats():
+    rows = [
+        (1, _vec(1).astype(float).tolist()),
+        (2, embedding_codec.encode(_vec(2), "float32")),
+        (3, memoryview(embedding_codec.encode(_vec(3), "int8"))),
+    ]
+    try:
+        index = index_from_rows(42, (3, 3), rows)
+        assert isinstance(index, ExactIndex) and index.fingerprint == (3, 3)
+        for key in (1, 2, 3):
+            hit_key, score = index.search(_vec(key), k=1)[0]
+            assert hit_key == key and score == pytest.approx(1.0, abs=1e-3)
+        assert index_from_rows(42, (0, 0), []) is None
+    finally:
+        drop_user_index(42)